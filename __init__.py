@@ -4,7 +4,7 @@ bl_info = {
     "author": "Konstantinos Mastorakis, Tim Balschmiter, Hagen Schoenkaese",
     "version": (2, 1, 0),
     "blender": (3, 5, 1),
-    "location": "File > Import > CityJSON (.json) || File > Export > CityJSON (.json)",
+    "location": "File > Import > CityJSON (.json/.jsonl) || File > Export > CityJSON (.json/.jsonl)",
     "description": "Visualize, edit and export 3D structures encoded in CityJSON format",
     "warning": "",
     "wiki_url": "",
@@ -12,9 +12,9 @@ bl_info = {
 }
 
 import bpy
-from .core.ImportOperator import ImportCityJSON
+from .core.ImportOperator import ImportCityJSON, ReloadCityJSON
 from .core.ExportOperator import ExportCityJSON
-from .core import EditMenu, ObjectMenu
+from .core import EditMenu, ObjectMenu, LazyImport, QueryPanel, CityObjectIndex
 
 
 
@@ -22,6 +22,7 @@ from .core import EditMenu, ObjectMenu
 classes = (
     # Import Operator
     ImportCityJSON,
+    ReloadCityJSON,
     # Export Operator
     ExportCityJSON,
     # EditMode Menu
@@ -33,16 +34,22 @@ classes = (
     ObjectMenu.VIEW3D_MT_cityobject_construction_submenu,
     ObjectMenu.SetAttributes,
     ObjectMenu.CalculateSemanticsOperator,
+    # Query Panel
+    QueryPanel.CityJSONQuerySettings,
+    QueryPanel.QueryCityObjectsOperator,
+    QueryPanel.EditCityObjectsOperator,
+    QueryPanel.VIEW3D_PT_cityjson_query,
 
 )
 
 def menu_func_import(self, context):
     """Defines the menu item for CityJSON import"""
-    self.layout.operator(ImportCityJSON.bl_idname, text="CityJSON (.json)")
+    self.layout.operator(ImportCityJSON.bl_idname, text="CityJSON (.json/.jsonl)")
+    self.layout.operator(ReloadCityJSON.bl_idname, text="CityJSON Reload from Source (.json/.jsonl)")
 
 def menu_func_export(self, context):
     """Defines the menu item for CityJSON export"""
-    self.layout.operator(ExportCityJSON.bl_idname, text="CityJSON (.json)")
+    self.layout.operator(ExportCityJSON.bl_idname, text="CityJSON (.json/.jsonl)")
 
 def objectmenu_func(self, context):
     """create context menu in object mode"""
@@ -77,6 +84,13 @@ def register():
     bpy.types.VIEW3D_MT_object_context_menu.append(objectmenu_func)
     # add menu to edit mode context menu
     bpy.types.VIEW3D_MT_edit_mesh_context_menu.append(editmenu_func)
+    # build the placeholders of lazy imports once they are selected or edited
+    bpy.app.handlers.depsgraph_update_post.append(LazyImport.placeholderHandler)
+    # criteria of the query panel
+    bpy.types.Scene.cityJSONQuery = bpy.props.PointerProperty(type=QueryPanel.CityJSONQuerySettings)
+    # the index of the query panel is built again after loading a file or undo
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        handlers.append(CityObjectIndex.resetIndexHandler)
     
     
 def unregister():
@@ -86,6 +100,12 @@ def unregister():
     bpy.types.VIEW3D_MT_object.append(objectmenu_func)
     bpy.types.VIEW3D_MT_object_context_menu.append(objectmenu_func)
     bpy.types.VIEW3D_MT_edit_mesh_context_menu.append(editmenu_func)
+    if LazyImport.placeholderHandler in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(LazyImport.placeholderHandler)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if CityObjectIndex.resetIndexHandler in handlers:
+            handlers.remove(CityObjectIndex.resetIndexHandler)
+    del bpy.types.Scene.cityJSONQuery
     for cls in classes:
         bpy.utils.unregister_class(cls)
 
@@ -0,0 +1,210 @@
+import base64
+import json
+import zlib
+import numpy
+
+def getCityObjectID(object):
+    # ID of the CityObject of a blender object, the attributes are keyed by it (objects created in blender use their name)
+    return object.get('cityJSONID', object.name)
+
+def getCityObjectIDs(objects):
+    # IDs of the CityObjects of the objects, keyed by the object name
+    # copies of an object (e.g. by Shift+D) share its cityJSONID, only the object named after the ID (otherwise the first) keeps it and the copies use their name
+    claimants = {}
+    for object in objects:
+        claimants.setdefault(getCityObjectID(object), []).append(object)
+    objectIDs = {}
+    for objID, group in claimants.items():
+        owner = next((object for object in group if object.name == objID), group[0])
+        for object in group:
+            objectIDs[object.name] = objID if object is owner else object.name
+    return objectIDs
+
+class AttributeColumn:
+
+    # marks the rows of CityObjects that do not have the attribute
+    noValue = object()
+    # array type of every kind of column, 'string' and 'json' columns hold indices into their dictionary
+    dtypes = {'bool': numpy.bool_, 'int': numpy.int64, 'float': numpy.float64, 'string': numpy.int32, 'json': numpy.int32}
+
+    def __init__(self, kind, values, missing, dictionary=None):
+        # 'bool', 'int', 'float', 'string' (strings and null) or 'json' (everything else, stored as JSON text)
+        self.kind = kind
+        # value (or dictionary index) of every row
+        self.values = values
+        # True for every row without the attribute
+        self.missing = missing
+        # distinct values of 'string' and 'json' columns
+        self.dictionary = dictionary if dictionary is not None else []
+
+    @classmethod
+    def getKind(cls, values):
+        # smallest kind that holds all given values exactly (integers are only mixed with floats)
+        types = {type(value) for value in values}
+        if types <= {bool}:
+            return 'bool'
+        if types <= {int}:
+            return 'int' if all(-2**63 <= value < 2**63 for value in values) else 'json'
+        if types <= {int, float}:
+            return 'float'
+        if types <= {str, type(None)}:
+            return 'string'
+        return 'json'
+
+    @classmethod
+    def fromValues(cls, values):
+        # column of the python values of all rows, noValue for the missing ones
+        missing = numpy.fromiter((value is cls.noValue for value in values), dtype=numpy.bool_, count=len(values))
+        present = [value for value in values if value is not cls.noValue]
+        kind = cls.getKind(present)
+        array = numpy.zeros(len(values), dtype=cls.dtypes[kind])
+        dictionary = None
+        if kind in ('string', 'json'):
+            # every distinct value is stored once
+            codes = {}
+            keys = present if kind == 'string' else [json.dumps(value, sort_keys=True) for value in present]
+            array[~missing] = [codes.setdefault(key, len(codes)) for key in keys]
+            dictionary = list(codes)
+        elif present:
+            array[~missing] = numpy.array(present, dtype=array.dtype)
+        return cls(kind, array, missing, dictionary)
+
+    @classmethod
+    def empty(cls, count):
+        return cls.fromValues([cls.noValue] * count)
+
+    def decode(self):
+        # python values of all rows, noValue for the missing ones
+        if self.kind in ('string', 'json'):
+            lookup = self.dictionary if self.kind == 'string' else [json.loads(text) for text in self.dictionary]
+            return [self.noValue if missing else lookup[code] for code, missing in zip(self.values.tolist(), self.missing.tolist())]
+        return [self.noValue if missing else value for value, missing in zip(self.values.tolist(), self.missing.tolist())]
+
+    def take(self, rows):
+        return AttributeColumn(self.kind, self.values[rows], self.missing[rows], self.dictionary)
+
+    def concatenate(self, other):
+        # rows of both columns, the kind is widened if the values of the other column do not fit
+        if other.missing.all() or self.missing.all():
+            base = other if self.missing.all() else self
+            values = [numpy.zeros(len(column.values), dtype=base.values.dtype) if column is not base else column.values for column in (self, other)]
+            return AttributeColumn(base.kind, numpy.concatenate(values), numpy.concatenate((self.missing, other.missing)), base.dictionary)
+        missing = numpy.concatenate((self.missing, other.missing))
+        if self.kind == other.kind and self.kind in ('string', 'json'):
+            # the codes of the other column are mapped to the joined dictionary
+            codes = {key: code for code, key in enumerate(self.dictionary)}
+            mapping = numpy.array([codes.setdefault(key, len(codes)) for key in other.dictionary], dtype=numpy.int32)
+            otherValues = numpy.where(other.missing, 0, mapping[numpy.where(other.missing, 0, other.values)])
+            return AttributeColumn(self.kind, numpy.concatenate((self.values, otherValues.astype(numpy.int32))), missing, list(codes))
+        if self.kind == other.kind:
+            return AttributeColumn(self.kind, numpy.concatenate((self.values, other.values)), missing)
+        if {self.kind, other.kind} == {'int', 'float'}:
+            return AttributeColumn('float', numpy.concatenate((self.values, other.values)).astype(numpy.float64), missing)
+        return AttributeColumn.fromValues(self.decode() + other.decode())
+
+    def compact(self):
+        # the dictionary only keeps the values that are still used
+        if self.kind not in ('string', 'json'):
+            return self
+        used, codes = numpy.unique(self.values[~self.missing], return_inverse=True)
+        values = numpy.zeros(len(self.values), dtype=numpy.int32)
+        values[~self.missing] = codes.reshape(-1)
+        return AttributeColumn(self.kind, values, self.missing, [self.dictionary[code] for code in used.tolist()])
+
+    def encodeArray(self, array):
+        return base64.b64encode(zlib.compress(array.tobytes())).decode('ascii')
+
+    def toJSON(self):
+        column = self.compact()
+        return {
+            "kind": column.kind,
+            "values": self.encodeArray(column.values),
+            "missing": self.encodeArray(numpy.packbits(column.missing)),
+            "dictionary": column.dictionary
+        }
+
+    @classmethod
+    def decodeArray(cls, text, dtype):
+        return numpy.frombuffer(zlib.decompress(base64.b64decode(text)), dtype=dtype).copy()
+
+    @classmethod
+    def fromJSON(cls, data, count):
+        values = cls.decodeArray(data['values'], cls.dtypes[data['kind']])
+        missing = numpy.unpackbits(cls.decodeArray(data['missing'], numpy.uint8))[:count].astype(numpy.bool_)
+        return cls(data['kind'], values, missing, data['dictionary'])
+
+class AttributeStore:
+
+    # custom property of the scene holding the attributes of all CityObjects
+    propertyName = 'cityJSONAttributes'
+
+    def __init__(self, ids=None, columns=None):
+        # ID of the CityObject of every row
+        self.ids = ids if ids is not None else []
+        # row of every CityObject, keyed by its ID
+        self.rowIndex = {objID: row for row, objID in enumerate(self.ids)}
+        # one column per attribute key
+        self.columns = columns if columns is not None else {}
+
+    @classmethod
+    def load(cls, scene):
+        text = scene.get(cls.propertyName)
+        if not text:
+            return cls()
+        data = json.loads(text)
+        ids = data['ids']
+        return cls(ids, {key: AttributeColumn.fromJSON(column, len(ids)) for key, column in data['columns'].items()})
+
+    def save(self, scene):
+        # the whole table is stored as a single property, the arrays of the columns are compressed
+        scene[self.propertyName] = json.dumps({
+            "ids": self.ids,
+            "columns": {key: column.toJSON() for key, column in self.columns.items()}
+        })
+
+    def selectRows(self, rows, ids):
+        # only the given rows are kept, columns without values are dropped
+        self.columns = {key: column.take(rows) for key, column in self.columns.items()}
+        self.columns = {key: column for key, column in self.columns.items() if not column.missing.all()}
+        self.ids = ids
+        self.rowIndex = {objID: row for row, objID in enumerate(self.ids)}
+
+    def update(self, ids, attributeList):
+        # add the attributes of the CityObjects, the rows of CityObjects which are already part of the store are replaced
+        rows = dict(zip(ids, attributeList))
+        keep = [row for row, objID in enumerate(self.ids) if objID not in rows]
+        self.selectRows(numpy.array(keep, dtype=numpy.int64), [self.ids[row] for row in keep])
+        keys = dict.fromkeys(key for attributes in rows.values() for key in attributes)
+        columns = {}
+        for key in dict.fromkeys(list(self.columns) + list(keys)):
+            column = self.columns.get(key) or AttributeColumn.empty(len(self.ids))
+            newColumn = AttributeColumn.fromValues([attributes.get(key, AttributeColumn.noValue) for attributes in rows.values()])
+            columns[key] = column.concatenate(newColumn)
+        self.columns = {key: column for key, column in columns.items() if not column.missing.all()}
+        self.ids = self.ids + list(rows)
+        self.rowIndex = {objID: row for row, objID in enumerate(self.ids)}
+
+    def remove(self, ids):
+        ids = set(ids)
+        keep = [row for row, objID in enumerate(self.ids) if objID not in ids]
+        self.selectRows(numpy.array(keep, dtype=numpy.int64), [self.ids[row] for row in keep])
+
+    def getAttributes(self):
+        # attributes of all CityObjects, keyed by their ID (built column by column)
+        result = {objID: {} for objID in self.ids}
+        for key, column in self.columns.items():
+            for objID, value in zip(self.ids, column.decode()):
+                if value is not AttributeColumn.noValue:
+                    result[objID][key] = value
+        return result
+
+    def setAttribute(self, ids, key, value):
+        # set the attribute of the given CityObjects to the same value, CityObjects without a row are appended
+        newIDs = [objID for objID in dict.fromkeys(ids) if objID not in self.rowIndex]
+        if newIDs:
+            self.update(newIDs, [{} for objID in newIDs])
+        column = self.columns.get(key)
+        values = column.decode() if column is not None else [AttributeColumn.noValue] * len(self.ids)
+        for objID in ids:
+            values[self.rowIndex[objID]] = value
+        self.columns[key] = AttributeColumn.fromValues(values)
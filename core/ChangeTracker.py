@@ -0,0 +1,174 @@
+import json
+import hashlib
+import os
+import numpy
+from .SurfaceAttribute import SurfaceAttribute
+from .SourceReader import openSourceReader, selectLOD
+
+class ChangeTracker:
+
+    # mesh data that is part of the hash: (collection, attribute, values per element, type)
+    hashedMeshData = (
+        ('vertices', 'co', 3, numpy.float32),
+        ('loops', 'vertex_index', 1, numpy.int32),
+        ('polygons', 'loop_start', 1, numpy.int32),
+        ('polygons', 'material_index', 1, numpy.int32),
+    )
+
+    def __init__(self, sourceSettings=None):
+        # byte ranges of the sources recorded by the imports, keyed by the normalized path of the file (export only)
+        self.sourceSettings = sourceSettings if sourceSettings is not None else {}
+        # readers of the imported files, which are opened when the first source is loaded (export only)
+        self.readers = {}
+
+    def computeHash(self, object):
+        # hash of everything the export derives from a blender object
+        if object.type != 'MESH':
+            return None
+        mesh = object.data
+        state = hashlib.sha1()
+        for collectionName, attribute, size, dtype in self.hashedMeshData:
+            collection = getattr(mesh, collectionName)
+            values = numpy.empty(len(collection) * size, dtype=dtype)
+            collection.foreach_get(attribute, values)
+            state.update(values.tobytes())
+        for material in mesh.materials:
+            if material is not None:
+                state.update(material.name.encode('utf-8'))
+                state.update(str(material.get('CJEOtype')).encode('utf-8'))
+        # the semantics of the faces
+        surfaceAttribute = SurfaceAttribute(object)
+        surfaceIndices = surfaceAttribute.read()
+        if surfaceIndices is not None:
+            state.update(surfaceIndices.tobytes())
+            state.update(json.dumps(surfaceAttribute.getTable()).encode('utf-8'))
+        for uvLayer in mesh.uv_layers:
+            values = numpy.empty(len(uvLayer.data) * 2, dtype=numpy.float32)
+            uvLayer.data.foreach_get('uv', values)
+            state.update(values.tobytes())
+        state.update(repr((object.get('cityJSONType'), object.get('LOD'))).encode('utf-8'))
+        return state.hexdigest()
+
+    def canPassThrough(self, objectJSON):
+        # objects with appearances or templates reference other parts of the file and are always rebuilt
+        for geom in objectJSON.get('geometry', []):
+            if 'texture' in geom or 'material' in geom or geom['type'] == 'GeometryInstance':
+                return False
+        return True
+
+    def iterIndices(self, boundaries):
+        # all vertex indices of the (arbitrarily nested) boundaries
+        if isinstance(boundaries, list):
+            for value in boundaries:
+                yield from self.iterIndices(value)
+        elif boundaries is not None:
+            yield boundaries
+
+    def remapIndices(self, boundaries, mapping):
+        if isinstance(boundaries, list):
+            return [self.remapIndices(value, mapping) for value in boundaries]
+        return mapping[boundaries]
+
+    def rebaseObject(self, objectJSON):
+        # copy of the CityObject whose boundaries reference its own vertices (in order of the file) and the file indices of these vertices
+        indices = numpy.fromiter((index for geom in objectJSON.get('geometry', []) for index in self.iterIndices(geom['boundaries'])), dtype=numpy.int64)
+        usedIndices = numpy.unique(indices)
+        mapping = dict(zip(usedIndices.tolist(), range(len(usedIndices))))
+        sourceObject = dict(objectJSON)
+        sourceObject['geometry'] = [dict(geom, boundaries=self.remapIndices(geom['boundaries'], mapping)) for geom in objectJSON.get('geometry', [])]
+        return sourceObject, usedIndices
+
+    def sourceHash(self, objectJSON, vertices, rebased=None):
+        # hash of a CityObject of a file, which does not depend on the position of its vertices in the file
+        sourceObject, usedIndices = rebased if rebased is not None else self.rebaseObject(objectJSON)
+        state = hashlib.sha1(json.dumps(sourceObject, sort_keys=True).encode('utf-8'))
+        state.update(numpy.ascontiguousarray(vertices[usedIndices], dtype=numpy.float64).tobytes())
+        return state.hexdigest()
+
+    def sourceCheck(self, sourceObject, sourceVertices):
+        # hash of the rebased CityObject and its real world vertices, compared when the source is read again on export
+        state = hashlib.sha1(json.dumps(sourceObject, sort_keys=True).encode('utf-8'))
+        state.update(numpy.ascontiguousarray(sourceVertices, dtype=numpy.float64).tobytes())
+        return state.hexdigest()
+
+    def storeSource(self, object, objID, filepath, objectJSON, vertices, sourceVertices, byteRange=None, lodSelection=None):
+        # store where the object comes from, the hash of its source and the hash of the new blender object
+        # only a reference to the source is kept, it is read from the file again on export
+        rebased = self.rebaseObject(objectJSON)
+        object['cityJSONID'] = objID
+        object['cityJSONFile'] = self.normalizePath(filepath)
+        object['cityJSONSourceHash'] = self.sourceHash(objectJSON, vertices, rebased)
+        if self.canPassThrough(objectJSON):
+            sourceObject, usedIndices = rebased
+            object['cityJSONSourceCheck'] = self.sourceCheck(sourceObject, sourceVertices[usedIndices])
+            # byte range of the CityObject, or of its feature in a CityJSONSeq file
+            if byteRange is not None:
+                object['cityJSONSourceRange'] = json.dumps(list(byteRange))
+            # LOD selection of the import, which is applied to the source again when it is read
+            if lodSelection is not None and lodSelection[0] != 'ALL':
+                object['cityJSONSourceLOD'] = json.dumps(lodSelection)
+        objectHash = self.computeHash(object)
+        if objectHash is not None:
+            object['cityJSONHash'] = objectHash
+
+    def updateSourceRange(self, object, byteRange):
+        # the source of an unchanged object may have moved within the file (reload only)
+        if 'cityJSONSourceCheck' in object and byteRange is not None:
+            object['cityJSONSourceRange'] = json.dumps(list(byteRange))
+
+    def normalizePath(self, filepath):
+        return os.path.normcase(os.path.abspath(filepath))
+
+    def isUnchanged(self, object):
+        # True if the object still matches the CityObject it was imported from
+        if 'cityJSONSourceCheck' not in object or 'cityJSONHash' not in object:
+            return False
+        return object['cityJSONHash'] == self.computeHash(object)
+
+    def getReader(self, filepath):
+        if filepath not in self.readers:
+            self.readers[filepath] = openSourceReader(filepath, self.sourceSettings.get(filepath))
+        return self.readers[filepath]
+
+    def getSourceRange(self, object):
+        return json.loads(object['cityJSONSourceRange']) if 'cityJSONSourceRange' in object else None
+
+    def loadSources(self, objects):
+        # sources of the unchanged objects, keyed by the name of the object (objects whose source cannot be used are left out)
+        # every file is read in the order of the byte ranges, so compressed files are never decompressed from the start again
+        unchanged = [object for object in objects if self.isUnchanged(object)]
+        unchanged.sort(key=lambda object: (object['cityJSONFile'], self.getSourceRange(object) or [0, 0]))
+        sources = {}
+        try:
+            for object in unchanged:
+                source = self.loadSource(object)
+                if source is not None:
+                    sources[object.name] = source
+        finally:
+            self.closeSources()
+        return sources
+
+    def loadSource(self, object):
+        # original JSON of the CityObject with its own, real world vertices, None if the file has changed since the import
+        reader = self.getReader(object['cityJSONFile'])
+        if reader is None:
+            return None
+        source = reader.readObject(object['cityJSONID'], self.getSourceRange(object))
+        if source is None:
+            return None
+        objectJSON, fileVertices = source
+        if 'cityJSONSourceLOD' in object and not selectLOD(objectJSON, *json.loads(object['cityJSONSourceLOD'])):
+            return None
+        sourceObject, usedIndices = self.rebaseObject(objectJSON)
+        if usedIndices.size and usedIndices.max() >= len(fileVertices):
+            return None
+        sourceVertices = fileVertices[usedIndices]
+        if self.sourceCheck(sourceObject, sourceVertices) != object['cityJSONSourceCheck']:
+            return None
+        return {"object": sourceObject, "vertices": sourceVertices.tolist()}
+
+    def closeSources(self):
+        for reader in self.readers.values():
+            if reader is not None:
+                reader.close()
+        self.readers = {}
@@ -2,17 +2,17 @@ import bpy
 import numpy
 import math
 from .Mesh import Mesh
-from.Material import Material
-import time
+from .ChangeTracker import ChangeTracker
+from .SurfaceAttribute import SurfaceAttribute
 
 class ImportCityObject:
 
-    def __init__(self, object, vertices, objID, textureSetting, rawObjectData, filepath):
+    def __init__(self, object, vertices, objID, textureSetting, rawObjectData, filepath, materialPalette, textureVertices, meshArrays=None):
         # entire data of the object
         self.object = object
         # the object's mesh
         self.mesh = []
-        # list of all vertices
+        # array of all vertices
         self.vertices = vertices
         # name/id of the object
         self.objectID = objID
@@ -30,33 +30,22 @@ class ImportCityObject:
         self.rawObjectData = rawObjectData
         # File to be imported
         self.filepath = filepath
-
-    # Print iterations progress
-    def printProgressBar (self, iteration, total, prefix = '', suffix = '', decimals = 1, length = 100, fill = '█', printEnd = "\r",time = ''):
-        """
-        Call in a loop to create terminal progress bar
-        @params:
-            iteration   - Required  : current iteration (Int)
-            total       - Required  : total iterations (Int)
-            prefix      - Optional  : prefix string (Str)
-            suffix      - Optional  : suffix string (Str)
-            decimals    - Optional  : positive number of decimals in percent complete (Int)
-            length      - Optional  : character length of bar (Int)
-            fill        - Optional  : bar fill character (Str)
-            printEnd    - Optional  : end character (e.g. "\r", "\r\n") (Str)
-        """
-        percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
-        filledLength = int(length * iteration // total)
-        bar = fill * filledLength + '-' * (length - filledLength)
-        print(f'\r{prefix} |{bar}| {percent}% ({iteration}/{total}) {suffix}  {time}', end = printEnd)
-        # Print New Line on Complete
-        if iteration == total: 
-            print()
+        # materials shared by all objects of the import
+        self.materialPalette = materialPalette
+        # array of all uv coordinates ("vertices-texture") of the appearance, None if there are none
+        self.textureVertices = textureVertices
+        # the blender object created for the CityObject
+        self.newObject = None
+        # vertices, loops and faces of the mesh if they have been prepared in advance (see ImportPipeline)
+        self.meshArrays = meshArrays
 
     def createMesh(self, object, vertices, oid):
         # create the objects mesh and store the data
         mesh = Mesh(object,vertices,oid)
-        self.mesh = mesh.execute()
+        if self.meshArrays is not None:
+            self.mesh = mesh.fillBlenderMesh(oid, *self.meshArrays)
+        else:
+            self.mesh = mesh.execute()
 
     def createObject(self, mesh):
         # create a new object with the stored mesh
@@ -64,10 +53,9 @@ class ImportCityObject:
         # create a custom property of the object to save its type and LOD
         newObj['cityJSONType'] = self.objectType
         newObj['LOD'] = self.objectLOD
-        # get the collection with the title "Collection"
-        collection = bpy.data.collections.get("Collection")
-        # add the new object to the collection
-        collection.objects.link(newObj)
+        # blender may shorten or rename the object, the ID is kept for the attributes and the export
+        newObj['cityJSONID'] = self.objectID
+        # the object is linked to a collection by the import process
         return newObj
 
 
@@ -75,29 +63,58 @@ class ImportCityObject:
         for geom in self.object['geometry']:
             # only create surface semanrics if the object is a solid and NOT a GenericCityObject
             if geom['type'] == 'Solid' and self.object['type']!='GenericCityObject':
-                l = len(geom['semantics']['values'][0])
-                # surfaceIndex --> the index in the "values"-array, which is the index of the surface
-                # surfaceValue --> the value of the surface, wich is a link to an entry in the "surfaces"-array
-                self.printProgressBar(0, l, prefix = 'Materials:', suffix = 'Complete', length = 50)
-                for surfaceIndex, surfaceValue in enumerate(geom['semantics']['values'][0]):
-                    time_mat = time.time()
-                    material = Material(geom['semantics']['surfaces'][surfaceValue]['type'], newObject, self.objectID, self.textureSetting, self.objectType, surfaceIndex, surfaceValue, self.rawObjectData, self.filepath, geom )
-                    material.execute()
-                    time_needed = time.time() - time_mat
-                    # Update Progress Bar
-                    self.printProgressBar(surfaceIndex+1 , l, prefix = 'Materials:', suffix = 'Complete', length = 50, time='t/m: %.4f sec' % (time_needed))
+                # surface value of every surface, which is a link to an entry in the "surfaces"-array
+                surfaceValues = numpy.array(geom['semantics']['values'][0], dtype=numpy.int64)
+                # texture reference of every surface (first theme, as this is the default for now), -1 if there is none
+                textureIndices = numpy.full(len(surfaceValues), -1, dtype=numpy.int64)
+                if self.textureSetting and 'texture' in geom:
+                    textureValues = list(geom['texture'].values())[0]['values'][0]
+                    textureIndices[:] = [-1 if face[0][0] is None else face[0][0] for face in textureValues]
+                # every distinct combination of surface and texture needs a material
+                combinations, surfaceCombinations = numpy.unique(numpy.stack((surfaceValues, textureIndices), axis=1), axis=0, return_inverse=True)
+                l = len(combinations)
+                # material slot of every material of the palette used by this object
+                slots = {}
+                # material slot of every combination
+                combinationSlots = numpy.zeros(l, dtype=numpy.int32)
+                for combinationIndex, (surfaceValue, textureIndex) in enumerate(combinations.tolist()):
+                    surfaceType = geom['semantics']['surfaces'][surfaceValue]['type']
+                    material = self.materialPalette.getMaterial(self.objectType, surfaceType, None if textureIndex < 0 else textureIndex, self.rawObjectData)
+                    # every distinct material gets a single slot of the object
+                    slot = slots.get(material.name)
+                    if slot is None:
+                        newObject.data.materials.append(material)
+                        slot = len(newObject.data.materials) - 1
+                        slots[material.name] = slot
+                        self.materials.append(material)
+                    combinationSlots[combinationIndex] = slot
+                # material slot of every surface/polygon
+                materialIndices = numpy.zeros(len(newObject.data.polygons), dtype=numpy.int32)
+                materialIndices[:len(surfaceValues)] = combinationSlots[surfaceCombinations.reshape(-1)]
+                self.assignMaterials(newObject, materialIndices)
+                self.assignSemantics(newObject, geom['semantics']['surfaces'], surfaceValues)
             else:
                 print("The geometry in this file has the type 'MultiSurface'. \nOnly type 'Solid' is currentlly supported in this version.")
             
-    def uvMapping(self, object, data, geom):
+    def assignMaterials(self, newObject, materialIndices):
+        # assign the material slots of all surfaces/polygons of the object at once
+        newObject.data.polygons.foreach_set('material_index', materialIndices)
+
+    def assignSemantics(self, newObject, surfaces, surfaceValues):
+        # the surface type of every polygon is stored as face attribute, which refers to the surface table of the object
+        surfaceAttribute = SurfaceAttribute(newObject)
+        tableIndices = numpy.array([surfaceAttribute.getIndex(surface['type']) for surface in surfaces], dtype=numpy.int32)
+        surfaceIndices = numpy.full(len(newObject.data.polygons), -1, dtype=numpy.int32)
+        surfaceIndices[:len(surfaceValues)] = tableIndices[surfaceValues]
+        surfaceAttribute.write(surfaceIndices)
+
+    def uvMapping(self, object, textureVertices, geom):
 
         # list of all themes used in the object
         themeNames = list(geom['texture'].keys())
         # name of the first theme, as this is the default for now
         themeName = themeNames[0]
 
-        # uv coordinates from json file
-        uv_coords = data['appearance']['vertices-texture']
         # all data from the json file
         mesh_data = object.data
         # create a new uv layer
@@ -106,49 +123,50 @@ class ImportCityObject:
         # set the new uv layer as the active layer
         mesh_data.uv_layers.active = uv_layer
 
+        # index of the first loop of every polygon/face
+        loopStarts = numpy.empty(len(mesh_data.polygons), dtype=numpy.int32)
+        mesh_data.polygons.foreach_get('loop_start', loopStarts)
+        loopStarts = loopStarts.tolist()
+        # mesh-loops of all textured faces and the index of the uv that belongs to each of them
+        loopIndices = []
+        uvIndices = []
         # iterate through faces
         for face_index, face in enumerate(geom['texture'][themeName]['values'][0]):
             # if the face has a texture (texture reference is not none)
-            if face != [[None]]:
-                # get the polygon/face from the newly created mesh
-                poly = mesh_data.polygons[face_index]
-                # iterate through the mesh-loops of the polygon/face
-                for vert_idx, loop_idx in enumerate(poly.loop_indices):
-                    # get the index of the uv that belongs to the vertex of the face
-                    # this is mapped using the values in the geom['texture'][theme_name]['values'], where the value at index 0 is the
-                    # index of the cooresponding texture-appearance, which means that the index of the vertex has to be increased by 1
-                    texture_map_value = face[0][vert_idx+1]
-                    # set UVs of the uv-layer using the texture_map_value as index for the list in the json data
-                    uv_layer.data[loop_idx].uv = (uv_coords[texture_map_value][0],uv_coords[texture_map_value][1])
-            
-            # if there is no texture --> do nothing  
-            else:
-                pass
+            # the value at index 0 is the index of the cooresponding texture-appearance, the uv indices follow
+            if face[0][0] is not None:
+                start = loopStarts[face_index]
+                loopIndices.extend(range(start, start + len(face[0]) - 1))
+                uvIndices.extend(face[0][1:])
+
+        # read the uvs of the new layer, replace the uvs of the textured faces and write them back at once
+        uvs = numpy.empty(len(mesh_data.loops) * 2, dtype=numpy.float32)
+        uv_layer.data.foreach_get('uv', uvs)
+        uvs = uvs.reshape(-1, 2)
+        uvs[numpy.array(loopIndices, dtype=numpy.int64)] = textureVertices[numpy.array(uvIndices, dtype=numpy.int64)]
+        uv_layer.data.foreach_set('uv', uvs.ravel())
 
 
     def execute(self):
         self.createMesh(self.object, self.vertices, self.objectID)
         newObject = self.createObject(self.mesh)
-        print("Mesh has been created!")
-        # select the object to become active object
-        bpy.data.objects[self.objectID].select_set(True)
-        bpy.context.view_layer.objects.active = bpy.data.objects[self.objectID]
+        self.newObject = newObject
         # create the objects materials and assign them
         self.createMaterials(newObject)
         if self.textureSetting ==True:
-            try:
+            if self.textureVertices is None or 'texture' not in self.object['geometry'][0]:
+                print("UV Mapping was not possible because the CityJSON file does not contain appearances!")
+            else:
                 # UV Mapping of the textures
-                self.uvMapping(newObject, self.rawObjectData, self.object['geometry'][0])
-            except:
-                    print("UV Mapping was not possible because the CityJSON file does not contain appearances!")
+                self.uvMapping(newObject, self.textureVertices, self.object['geometry'][0])
         else: pass
 
 class ExportCityObject:
-    def __init__(self, object, lastVertexIndex, jsonExport, textureSetting, textureReferenceList):
+    def __init__(self, object, objID, lastVertexIndex, jsonExport, textureSetting, textureIndex):
         self.object = object
         # all vertices of the current object
         self.vertices = []
-        self.objID = self.object.name
+        self.objID = objID
         self.objType = self.object['cityJSONType']
         self.lod = self.object['LOD']
         self.maxValue = ""
@@ -157,119 +175,118 @@ class ExportCityObject:
         self.json = {}
         self.geometry = []
         self.lastVertexIndex = lastVertexIndex
+        # export vertex index of every loop and first loop / number of loops of every polygon
+        self.boundaryIndices = None
+        self.loopStarts = None
+        self.loopTotals = None
         self.semanticValues = []
         self.scalefactor = 0.001
         self.jsonExport = jsonExport
         self.textureValues = []
         self.textureSetting = textureSetting
-        self.counter = 0
-        self.textureReferenceList = textureReferenceList
+        # index of the textures and uv coordinates of the exported appearance
+        self.textureIndex = textureIndex
+        self.materialIndices = None
 
 
     def getVertices(self):
-        vertexArray = []
+        # read all vertex coordinates of the mesh at once
         vertices = self.object.data.vertices
-        for vertex in vertices:
-            vertexCoordinates = vertex.co
-            vertexJSON = []
-            vertexJSON.append(vertexCoordinates[0])
-            vertexJSON.append(vertexCoordinates[1])
-            vertexJSON.append(vertexCoordinates[2])
-            vertexArray.append(vertexJSON)
-        self.vertices = vertexArray
+        vertexArray = numpy.empty(len(vertices) * 3, dtype=numpy.float32)
+        vertices.foreach_get('co', vertexArray)
+        self.vertices = vertexArray.reshape(-1, 3).astype(numpy.float64)
 
     def getObjectExtend(self):
-        objGeoExtend = []
-        vertices = numpy.asarray(self.vertices)
-        maxValue = vertices.max(axis=0, keepdims=True)[0]
-        maxValue = maxValue+self.offsetArray
-        minValue = vertices.min(axis=0, keepdims=True)[0]
-        minValue = minValue+self.offsetArray
-        for i in minValue:
-            objGeoExtend.append(round(i,3))
-        for i in maxValue:
-            objGeoExtend.append(round(i,3))
-        self.objGeoExtent = objGeoExtend
+        maxValue = self.vertices.max(axis=0) + self.offsetArray
+        minValue = self.vertices.min(axis=0) + self.offsetArray
+        self.objGeoExtent = numpy.round(numpy.concatenate((minValue, maxValue)), 3).tolist()
 
     def getBoundaries(self):
-        # get the mesh by name
-        mesh = bpy.data.meshes[self.objID]
-        boundaries = []
-        # iterate through polygons
-        for poly in mesh.polygons:
-            loop = []
-            # iterate through loops inside polygons
-            # get the vertex coordinates and find the Index in the corresponding list of all vertices
-            for loop_index in poly.loop_indices:
-                vertexIndex = mesh.loops[loop_index].vertex_index
-                vertexValue = []
-                vertexValue.append(mesh.vertices[vertexIndex].co[0])
-                vertexValue.append(mesh.vertices[vertexIndex].co[1])
-                vertexValue.append(mesh.vertices[vertexIndex].co[2])
-                exportIndex = self.vertices.index(vertexValue)
-                # close the loop
-                loop.append(exportIndex+self.lastVertexIndex)
-            boundaries.append([loop])
-        maxVertex = max([max(j) for j in [max(i) for i in boundaries]])
-        self.lastVertexIndex = maxVertex
-        self.geometry = [{
-            "type": "Solid",
-            "lod": self.lod,
-            "boundaries" : [boundaries]
-        }]
+        mesh = self.object.data
+        # vertex index of every loop and first loop / number of loops of every polygon
+        loopVertexIndices = numpy.empty(len(mesh.loops), dtype=numpy.int32)
+        mesh.loops.foreach_get('vertex_index', loopVertexIndices)
+        self.loopStarts = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+        mesh.polygons.foreach_get('loop_start', self.loopStarts)
+        self.loopTotals = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+        mesh.polygons.foreach_get('loop_total', self.loopTotals)
+        # the vertices of the object are appended behind the vertices of all previous objects
+        self.setBoundaries(loopVertexIndices.astype(numpy.int64) + self.lastVertexIndex)
+        self.lastVertexIndex = self.lastVertexIndex + len(self.vertices) - 1
+
+    def setBoundaries(self, boundaryIndices):
+        # export vertex index of every loop of the object
+        self.boundaryIndices = boundaryIndices
+        exportIndices = boundaryIndices.tolist()
+        # every polygon is a surface with a single ring
+        boundaries = [[exportIndices[start:start + total]] for start, total in zip(self.loopStarts.tolist(), self.loopTotals.tolist())]
+        if self.geometry:
+            # the geometry is already part of the JSON of the object, so it is updated in place
+            self.geometry[0]["boundaries"] = [boundaries]
+        else:
+            self.geometry = [{
+                "type": "Solid",
+                "lod": self.lod,
+                "boundaries" : [boundaries]
+            }]
 
     def getSemantics(self):
-        mesh = bpy.data.meshes[self.objID]
-        self.semanticValues = []
-        self.semanticSurfaces =[]
-        # iterate through polygons
-        for polyIndex, poly  in enumerate(mesh.polygons):
-            # index of the material slot of the current polygon in blender
-            blenderMaterialIndex = poly.material_index 
-
-            # List of all polygons in index order from 0 to xxx
-            self.semanticValues.append(polyIndex)
-            
-            # type of surface (semantic of surface) of current polygon
-            semanticSurface = mesh.materials[blenderMaterialIndex]['CJEOtype']
-            # List of semantics in reordered from blenders indices to order of polygon indices
-            # example: polygon 4 has semanticValue index of 4 --> semantics of material that is in material slot 163 in blender is written at the current index of 4 in the semanticSurfaces list via append  
-            self.semanticSurfaces.append({"type": semanticSurface})
-
-            if self.textureSetting:
-                # extract uv mapping
-                self.getTextureMapping(mesh, poly, blenderMaterialIndex, polyIndex)
-
-    def getTextureMapping(self, mesh, poly, semantic, polyIndex):
-        #check if face has texture
-        if len(mesh.materials[semantic].node_tree.nodes) > 2:
-            print(str(polyIndex) + " has texture!")
-            #face_material = semantic - self.counter
-
-            # index of texture in appearances section of CityJSON
-            # name of the image of the material
-            faceMaterial = mesh.materials[semantic].node_tree.nodes['Image Texture'].image.name
-            textureIndex =  self.textureReferenceList.index(faceMaterial)
-
-            # number of loops in the polygon (is equal to vertices)
-            loopTotal = poly.loop_total
-            uv_layer = mesh.uv_layers[0].data
-            uvList = self.jsonExport['appearance']['vertices-texture']
-            #self.textureValues.append([[face_material]])
-            self.textureValues.append([[textureIndex]])
-
-            for loop_index in range(poly.loop_start, poly.loop_start + loopTotal):
-                uv = uv_layer[loop_index].uv
-                u = uv[0]
-                v = uv[1]
-                vertices_textureJSON = [round(u,7),
-                                        round(v,7)]
-                uv_index = uvList.index(vertices_textureJSON)
-                self.textureValues[polyIndex][0].append(uv_index) 
+        mesh = self.object.data
+        # index of the material slot of every polygon in blender
+        self.materialIndices = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+        mesh.polygons.foreach_get('material_index', self.materialIndices)
+        surfaceAttribute = SurfaceAttribute(self.object)
+        surfaceIndices = surfaceAttribute.read()
+        if surfaceIndices is not None:
+            self.setSemantics(surfaceIndices, surfaceAttribute.getTable())
         else:
-            print(str(polyIndex) + " does NOT have texture!")
-            self.textureValues.append([[None]])
-            self.counter =+ 1
+            # objects without the semantics attribute keep their surface types in the materials
+            slotSemantics = [material['CJEOtype'] if material is not None else None for material in mesh.materials]
+            self.setSemantics(self.materialIndices, slotSemantics)
+
+        if self.textureSetting:
+            # extract uv mapping
+            self.getTextureMapping(mesh)
+
+    def setSemantics(self, surfaceIndices, surfaceTypes):
+        # only the surface types used by the object are written, polygons without semantics get null
+        self.semanticValues, self.semanticSurfaces = SurfaceAttribute(self.object).compactSemantics(surfaceIndices, surfaceTypes)
+
+    def getSlotTexture(self, material):
+        # index of the texture of the material in the appearances section of CityJSON, None if it has no texture
+        if material is None or material.node_tree is None or len(material.node_tree.nodes) <= 2:
+            return None
+        imageNode = material.node_tree.nodes.get('Image Texture')
+        if imageNode is None or imageNode.image is None:
+            return None
+        return self.textureIndex.getTexture(imageNode.image.name)
+
+    def getTextureMapping(self, mesh):
+        # texture index of every material slot and of every polygon
+        slotTextures = [self.getSlotTexture(material) for material in mesh.materials]
+        polyTextures = [slotTextures[materialIndex] for materialIndex in self.materialIndices.tolist()]
+        loopStarts = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+        mesh.polygons.foreach_get('loop_start', loopStarts)
+        loopTotals = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+        mesh.polygons.foreach_get('loop_total', loopTotals)
+        # uvs of all loops of the object
+        uvs = numpy.zeros(len(mesh.loops) * 2, dtype=numpy.float32)
+        if len(mesh.uv_layers) > 0:
+            mesh.uv_layers[0].data.foreach_get('uv', uvs)
+        uvs = uvs.reshape(-1, 2)
+        # only the uvs of textured polygons are written to "vertices-texture"
+        texturedPolys = numpy.array([texture is not None for texture in polyTextures], dtype=bool)
+        texturedLoops = numpy.repeat(texturedPolys, loopTotals)
+        uvIndices = self.textureIndex.addUVs(uvs[texturedLoops]).tolist()
+
+        self.textureValues = []
+        cursor = 0
+        for textureIndex, total in zip(polyTextures, loopTotals.tolist()):
+            if textureIndex is not None:
+                self.textureValues.append([[textureIndex] + uvIndices[cursor:cursor + total]])
+                cursor += total
+            else:
+                self.textureValues.append([[None]])
 
     def createJSON(self):
         self.json = {self.objID : {"geographicalExtent" : self.objGeoExtent}}
@@ -291,4 +308,92 @@ class ExportCityObject:
         else: 
             self.getSemantics()
         self.createJSON()
-        
\ No newline at end of file
+        
+class ExportMergedCityObject(ExportCityObject):
+    def __init__(self, object, part, lastVertexIndex, jsonExport, textureIndex):
+        # textures are not kept for merged meshes
+        super().__init__(object, part['id'], lastVertexIndex, jsonExport, False, textureIndex)
+        # vertices, faces, type, LOD and semantics of the CityObject as part of the merged mesh
+        self.part = part
+        self.objType = part['type']
+        self.lod = part['lod']
+
+    def getVertices(self):
+        self.vertices = self.part['vertices']
+
+    def getBoundaries(self):
+        self.loopStarts = self.part['loopStarts']
+        self.loopTotals = self.part['loopTotals']
+        # the vertices of the object are appended behind the vertices of all previous objects
+        self.setBoundaries(self.part['loopVertexIndices'] + self.lastVertexIndex)
+        self.lastVertexIndex = self.lastVertexIndex + len(self.vertices) - 1
+
+    def getSemantics(self):
+        self.setSemantics(self.part['surfaceIndices'], self.part['surfaceTypes'])
+
+class ExportInstanceCityObject:
+    def __init__(self, object, objID, lastVertexIndex, templateIndex):
+        self.object = object
+        # reference point of the instance (the only vertex of the object)
+        self.vertices = []
+        self.objID = objID
+        self.objType = self.object['cityJSONType']
+        self.json = {}
+        self.lastVertexIndex = lastVertexIndex
+        # index of the template of the shared mesh in "geometry-templates"
+        self.templateIndex = templateIndex
+        # export vertex index of the reference point
+        self.boundaryIndices = None
+        self.geometry = {}
+
+    def setBoundaries(self, boundaryIndices):
+        self.boundaryIndices = boundaryIndices
+        self.geometry["boundaries"] = boundaryIndices.tolist()
+
+    def execute(self):
+        # the translation of the object becomes the reference point, the rest of its matrix the transformation of the template
+        matrix = self.object.matrix_world.copy()
+        self.vertices = numpy.array([list(matrix.translation)], dtype=numpy.float64)
+        matrix.translation = (0.0, 0.0, 0.0)
+        self.geometry = {
+            "type": "GeometryInstance",
+            "template": self.templateIndex,
+            "transformationMatrix": [round(value, 6) for row in matrix for value in row],
+        }
+        self.setBoundaries(numpy.array([self.lastVertexIndex], dtype=numpy.int64))
+        self.json = {self.objID : {"type": self.objType, "geometry": [self.geometry]}}
+
+class PassthroughCityObject:
+    def __init__(self, object, objID, lastVertexIndex, source):
+        self.object = object
+        # all vertices of the current object
+        self.vertices = []
+        self.objID = objID
+        self.offsetArray = [bpy.context.scene.world['X_Origin'],bpy.context.scene.world['Y_Origin'],bpy.context.scene.world['Z_Origin']]
+        self.json = {}
+        self.lastVertexIndex = lastVertexIndex
+        # original JSON of the CityObject and its real world vertices, as stored during the import
+        self.source = source
+        # export vertex index of every vertex reference in the boundaries
+        self.boundaryIndices = None
+
+    def fillIndices(self, boundaries, indices):
+        # replace the vertex indices of the (arbitrarily nested) boundaries in order
+        if isinstance(boundaries, list):
+            return [self.fillIndices(value, indices) for value in boundaries]
+        return next(indices)
+
+    def setBoundaries(self, boundaryIndices):
+        self.boundaryIndices = boundaryIndices
+        indices = iter(boundaryIndices.tolist())
+        for geom in self.json[self.objID]['geometry']:
+            geom['boundaries'] = self.fillIndices(geom['boundaries'], indices)
+
+    def execute(self):
+        # the vertices are relative to the world origin, just like the vertices of a blender mesh
+        self.vertices = numpy.array(self.source['vertices'], dtype=numpy.float64).reshape(-1, 3) - self.offsetArray
+        self.json = {self.objID : self.source['object']}
+        # the local vertex indices of the source are moved behind the vertices of all previous objects
+        localIndices = [index for geom in self.source['object'].get('geometry', []) for index in ChangeTracker().iterIndices(geom['boundaries'])]
+        self.setBoundaries(numpy.array(localIndices, dtype=numpy.int64) + self.lastVertexIndex)
+        self.lastVertexIndex = self.lastVertexIndex + len(self.vertices) - 1
@@ -0,0 +1,131 @@
+import bpy
+import json
+from bpy.app.handlers import persistent
+from .AttributeStore import AttributeStore, AttributeColumn, getCityObjectID, getCityObjectIDs
+
+# index of the current scene, built on the first query
+cityObjectIndex = None
+
+class CityObjectIndex:
+
+    def __init__(self, scene):
+        # scene whose objects and attribute store are indexed
+        self.scenePointer = scene.as_pointer()
+        # names and pointers of the objects when the index was built, the index is rebuilt if objects are added, removed or renamed elsewhere
+        self.objectKeys = getObjectKeys()
+        # names of the objects of every type and LOD
+        self.types = {}
+        self.lods = {}
+        # type, LOD and CityObject IDs of every object, keyed by its name (to update the index incrementally)
+        self.entries = {}
+        # names of the objects of every CityObject ID
+        self.objectNames = {}
+        # CityObject ID of every object, keyed by its name (copies sharing a cityJSONID use their name, as on export)
+        self.objectIDs = {}
+        # CityObject IDs of every value of every attribute key (values are compared as text)
+        self.attributes = {}
+        self.store = AttributeStore.load(scene)
+
+    def valueKey(self, value):
+        return value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+
+    def getObjectIDs(self, object):
+        # IDs of the CityObjects of the object, merged objects hold all CityObjects of their parts
+        if object.get('cityJSONMerged'):
+            return json.loads(object['cityJSONObjects'])
+        return [self.objectIDs.get(object.name, getCityObjectID(object))]
+
+    def addObject(self, object):
+        objectType = object.get('cityJSONType')
+        lod = object.get('LOD')
+        if objectType is None and lod is None:
+            return
+        lod = None if lod is None else int(lod)
+        objectIDs = self.getObjectIDs(object)
+        self.entries[object.name] = (objectType, lod, objectIDs)
+        self.types.setdefault(objectType, set()).add(object.name)
+        self.lods.setdefault(lod, set()).add(object.name)
+        for objID in objectIDs:
+            self.objectNames.setdefault(objID, set()).add(object.name)
+
+    def removeObject(self, name):
+        entry = self.entries.pop(name, None)
+        if entry is None:
+            return
+        objectType, lod, objectIDs = entry
+        self.types[objectType].discard(name)
+        self.lods[lod].discard(name)
+        for objID in objectIDs:
+            self.objectNames[objID].discard(name)
+
+    def updateObject(self, object):
+        # the entry of a single object is replaced after its type or LOD has been changed
+        self.removeObject(object.name)
+        self.addObject(object)
+
+    def indexAttribute(self, key, ids, values):
+        index = self.attributes.setdefault(key, {})
+        for objID, value in zip(ids, values):
+            if value is not AttributeColumn.noValue:
+                index.setdefault(self.valueKey(value), set()).add(objID)
+
+    def build(self):
+        self.objectIDs = getCityObjectIDs(bpy.data.objects)
+        for object in bpy.data.objects:
+            self.addObject(object)
+        # the attribute store is indexed column by column
+        for key, column in self.store.columns.items():
+            self.indexAttribute(key, self.store.ids, column.decode())
+        print('Indexed %d objects and %d attribute keys!' % (len(self.entries), len(self.attributes)))
+
+    def query(self, objectType='', lod=-1, key='', value=''):
+        # names of the objects matching all given criteria (an empty type or key and a negative LOD match everything)
+        result = set(self.entries)
+        if objectType:
+            result &= self.types.get(objectType, set())
+        if lod >= 0:
+            result &= self.lods.get(lod, set())
+        if key:
+            index = self.attributes.get(key, {})
+            ids = index.get(value, set()) if value else set().union(*index.values())
+            result &= {name for objID in ids for name in self.objectNames.get(objID, ())}
+        return result
+
+    def setAttribute(self, objects, key, value):
+        # the attribute is set in the store of the scene and the index of its values is updated (for all parts of merged objects)
+        ids = list(dict.fromkeys(objID for object in objects for objID in self.getObjectIDs(object)))
+        index = self.attributes.setdefault(key, {})
+        for objectIDs in index.values():
+            objectIDs.difference_update(ids)
+        index.setdefault(self.valueKey(value), set()).update(ids)
+        self.store.setAttribute(ids, key, value)
+
+    def save(self, scene):
+        self.store.save(scene)
+
+def getObjectKeys():
+    # an object deleted and added again under the same name has a new pointer
+    return {(object.name, object.as_pointer()) for object in bpy.data.objects}
+
+def getIndex(scene):
+    # the index is built once per scene and updated incrementally by the operators of the addon
+    global cityObjectIndex
+    if cityObjectIndex is None or cityObjectIndex.scenePointer != scene.as_pointer() or cityObjectIndex.objectKeys != getObjectKeys():
+        cityObjectIndex = CityObjectIndex(scene)
+        cityObjectIndex.build()
+    return cityObjectIndex
+
+def updateIndex(object):
+    # keeps the index up to date after the type or LOD of an object has been changed
+    if cityObjectIndex is not None and object is not None:
+        cityObjectIndex.updateObject(object)
+
+def resetIndex():
+    # the index is built again on the next query (e.g. after an import)
+    global cityObjectIndex
+    cityObjectIndex = None
+
+@persistent
+def resetIndexHandler(*args):
+    # objects and attributes may have changed by loading a file or by undo
+    resetIndex()
@@ -1,6 +1,7 @@
 import bpy
 from .FeatureTypes import FeatureTypes
-from .Material import Material
+from .MaterialPalette import MaterialPalette
+from .SurfaceAttribute import SurfaceAttribute
 
 class VIEW3D_MT_cityedit_mesh_context_submenu(bpy.types.Menu):
     bl_label = 'SurfaceTypes'
@@ -29,32 +30,9 @@ class SetSurfaceOperator(bpy.types.Operator):
     def execute(self, context):
         obj = context.object
         if obj.type == 'MESH':
-            mesh = obj.data # Assumed that obj.type == 'MESH'
-            bpy.context.object.update_from_editmode()
-            # iterate faces
-            for face in mesh.polygons:
-                # get faces that are selected
-                if face.select == True:
-                    try:
-                        material = bpy.context.object.active_material.name
-                        #print("name of the surface's old material: "+ str(material))
-                    except:
-                        print("The Face does not have a Material or the Material has already been removed!")
-
-                    # create the material as object
-                    mat = Material(type=self.surfaceType, newObject=obj, objectID=obj.id_data.name, textureSetting=False, objectType=obj['cityJSONType'], surfaceIndex=None, surfaceValue=None, filepath=None, rawObjectData=None, geometry=None)
-                    mat.createMaterial()                
-                    # set the color of the material
-                    mat.setColor()
-                    # assign the new material to the face
-                    mat.addMaterialToFace(bpy.context.object.active_material_index, face.index )
-        
-        # remove the now unused material-slots and delete the data-blocks
-        bpy.ops.object.mode_set(mode='OBJECT')
-        bpy.ops.object.material_slot_remove_unused()
-        bpy.ops.outliner.orphans_purge(do_local_ids=True, do_linked_ids=False, do_recursive=True)
-        bpy.ops.object.mode_set(mode='EDIT')
-      
+            # the surface type is written to the semantics attribute of the selected faces
+            # the shared material of the surface type is only assigned for display
+            palette = MaterialPalette(False, "", True)
+            material = palette.getMaterial(obj['cityJSONType'], self.surfaceType, None, None)
+            SurfaceAttribute(obj).writeSelected(self.surfaceType, material)
         return {'FINISHED'}
-
-    
\ No newline at end of file
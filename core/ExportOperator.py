@@ -2,6 +2,8 @@ from bpy.props import BoolProperty, EnumProperty, StringProperty, IntProperty
 from bpy.types import Operator
 from bpy_extras.io_utils import ExportHelper
 from .ExportProcess import ExportProcess
+from .JSONWriter import stripCompression
+import os
 
 # Import Operator
 class ExportCityJSON(Operator, ExportHelper):
@@ -14,18 +16,82 @@ class ExportCityJSON(Operator, ExportHelper):
     filename_ext = ".json"
 
     filter_glob: StringProperty(
-        default="*.json",
+        default="*.json;*.jsonl;*.json.gz;*.jsonl.gz;*.json.xz;*.jsonl.xz",
         options={'HIDDEN'},
         maxlen=255,  # Max internal buffer length, longer would be clamped.
     )
 
     # List of Operator properties
+    export_format: EnumProperty(
+        name="Format",
+        description="Choose if the scene is written as a single CityJSON document or as CityJSONSeq with one feature per line",
+        items=(
+            ('JSON', "CityJSON (.json)", "Write a single CityJSON document"),
+            ('JSONL', "CityJSONSeq (.city.jsonl)", "Write a CityJSON Text Sequence with one CityJSONFeature per line"),
+        ),
+        default='JSON',
+    )
+
     texture_setting: BoolProperty(
         name="Export Textures",
         description="Choose if textures present in blender should be exported to the CityJSON file",
         default=True,
     )
 
+    weld_setting: BoolProperty(
+        name="Merge Shared Vertices",
+        description="Write vertices shared by several objects only once and drop unused vertices (CityJSON only)",
+        default=False,
+    )
+
+    compact_setting: BoolProperty(
+        name="Compact",
+        description="Write the file without any whitespace",
+        default=False,
+    )
+
+    compression: EnumProperty(
+        name="Compression",
+        description="Choose if the file should be compressed",
+        items=(
+            ('NONE', "None", "Write an uncompressed file"),
+            ('GZIP', "gzip (.gz)", "Compress the file with gzip"),
+            ('XZ', "xz (.xz)", "Compress the file with xz"),
+        ),
+        default='NONE',
+    )
+
+    passthrough_setting: BoolProperty(
+        name="Copy Unchanged Objects",
+        description="Copy objects which did not change since their import from the imported file instead of rebuilding them",
+        default=True,
+    )
+
+    def getExtension(self):
+        # the file extension follows the chosen format and compression
+        extension = ".city.jsonl" if self.export_format == 'JSONL' else ".json"
+        return extension + {'NONE': "", 'GZIP': ".gz", 'XZ': ".xz"}[self.compression]
+
+    def getExportPath(self):
+        # the extensions of the format and the compression are replaced by the chosen ones
+        filepath = stripCompression(self.filepath)
+        for extension in (".city.jsonl", ".jsonl", ".json"):
+            if filepath.lower().endswith(extension):
+                filepath = filepath[:-len(extension)]
+                break
+        return filepath + self.getExtension()
+
+    def check(self, context):
+        self.filename_ext = self.getExtension()
+        if not os.path.basename(self.filepath):
+            return False
+        filepath = self.getExportPath()
+        if filepath != self.filepath:
+            self.filepath = filepath
+            return True
+        return False
+
     def execute(self, context):
-        CityJSONExport = ExportProcess(self.filepath, self.texture_setting)
-        return CityJSONExport.execute()
\ No newline at end of file
+        self.filepath = self.getExportPath()
+        CityJSONExport = ExportProcess(self.filepath, self.texture_setting, self.export_format == 'JSONL', self.weld_setting, self.compact_setting, self.passthrough_setting, self.compression)
+        return CityJSONExport.execute()
@@ -1,18 +1,52 @@
-import json
 import bpy
+import numpy
 import os
 import shutil
-from .CityObject import ExportCityObject
+from .CityObject import ExportCityObject, ExportMergedCityObject, ExportInstanceCityObject, PassthroughCityObject
+from .MergedMesh import MergedMeshReader
+from .LazyImport import materializePlaceholders
+from .GeometryTemplate import ExportTemplates
+from .ChangeTracker import ChangeTracker
+from .ImportProcess import ImportProcess
+from .TextureIndex import TextureIndex
+from .JSONWriter import JSONWriter
+from .AttributeStore import AttributeStore, getCityObjectIDs
 
 class ExportProcess:
     
-    def __init__(self, filepath, textureSetting):
+    def __init__(self, filepath, textureSetting, sequenceSetting=False, weldSetting=False, compactSetting=False, passthroughSetting=False, compressionSetting='NONE'):
         self.filepath = filepath
+        # True - CityJSONSeq (JSON Lines) export, which writes one CityJSONFeature per line
+        # False - export as a single CityJSON document
+        self.sequenceFile = sequenceSetting
+        # True - vertices shared by several objects are written only once, unused vertices are dropped
+        # False - the vertices of every object are written as they are
+        self.weldSetting = weldSetting
+        # True - the file is written without whitespace
+        # False - the file is written with the default whitespace of the json module
+        self.compactSetting = compactSetting
+        # 'NONE' - the file is written uncompressed
+        # 'GZIP' / 'XZ' - the file is compressed with gzip / xz
+        self.compressionSetting = compressionSetting
+        # True - objects which did not change since their import are copied from the imported file
+        # False - every object is rebuilt from its mesh
+        self.passthroughSetting = passthroughSetting
+        # sources of the objects which did not change since their import, keyed by the name of the object
+        self.sources = {}
+        # number of objects copied from the imported file
+        self.passthroughCount = 0
         self.jsonExport = None
         # True - export textures
         # False - do not export textures
         self.textureSetting = textureSetting
-        self.textureReferenceList = []
+        # index of the exported textures and uv coordinates ("vertices-texture" without duplicates)
+        self.textureIndex = None
+        # templates of the meshes shared by instances
+        self.templates = ExportTemplates()
+        # attributes of the CityObjects, keyed by their ID (read from the attribute store of the scene)
+        self.attributes = {}
+        # CityObject ID of every object, keyed by its name (copies sharing a cityJSONID are exported under their name)
+        self.objectIDs = {}
 
     def createJSONStruct(self):
         if self.textureSetting: 
@@ -62,6 +96,7 @@ class ExportProcess:
         self.jsonExport["transform"]["translate"].append(bpy.context.scene.world['Z_Origin'])
 
     def getTextures(self):
+        self.textureIndex = TextureIndex(self.jsonExport['appearance']['vertices-texture'])
         allTextures = bpy.data.textures.data.images
         for texture in allTextures:
             imageType = texture.file_format
@@ -83,45 +118,95 @@ class ExportProcess:
                     ]
                 }
                 self.jsonExport['appearance']['textures'].append(textureJSON)
-                self.textureReferenceList.append(basename)
+                self.textureIndex.addTexture(basename)
                 self.exportTextures(texture)
 
-    def getVerticesTexture(self):
-        meshes = bpy.data.meshes
-       
-        for mesh in meshes:
-            uv_layer = mesh.uv_layers[0].data
-            for polyIndex, poly  in enumerate(mesh.polygons):
-                semantic = poly.material_index
-                loopTotal = poly.loop_total
-                if len(mesh.materials[semantic].node_tree.nodes) > 2:
-                    for loop_index in range(poly.loop_start, poly.loop_start + loopTotal):
-                        uv = uv_layer[loop_index].uv
-                        u = uv[0]
-                        v = uv[1]
-                        vertices_textureJSON = [round(u,7),
-                                                round(v,7)]
-                        self.jsonExport['appearance']['vertices-texture'].append(vertices_textureJSON)
-                else: 
-                    pass
+    def getTemplates(self):
+        # every mesh shared by instances is written once as template
+        for object in bpy.data.objects:
+            if object.get('cityJSONTemplate') is not None and object.type == 'MESH':
+                self.templates.addTemplate(object)
+        if self.templates.json["templates"]:
+            self.jsonExport["geometry-templates"] = self.templates.json
+
+    def quantizeVertices(self, vertices):
+        # integer coordinates according to the scale of the transform property
+        return numpy.round(vertices / 0.001).astype(numpy.int64)
+
+    def iterExportObjects(self):
+        # yields every blender object, merged meshes are split into their CityObjects
+        for object in bpy.data.objects:
+            if object.get('cityJSONMerged'):
+                for part in MergedMeshReader(object).iterParts():
+                    yield object, part
+            else:
+                yield object, None
+
+    def addAttributes(self, cityObjects):
+        # the attributes are taken from the attribute store, also for objects copied from the source
+        for objID, objectJSON in cityObjects.items():
+            attributes = self.attributes.get(objID)
+            if attributes:
+                objectJSON['attributes'] = attributes
+
+    def createExportObject(self, object, part, lastVertexIndex, jsonExport, textureIndex):
+        # unchanged objects are copied from the source, all others are rebuilt from their mesh
+        if part is not None:
+            return ExportMergedCityObject(object, part, lastVertexIndex, jsonExport, textureIndex)
+        if object.get('cityJSONTemplate') is not None and object.type == 'MESH':
+            return ExportInstanceCityObject(object, self.objectIDs[object.name], lastVertexIndex, self.templates.addTemplate(object))
+        source = self.sources.get(object.name)
+        if source is not None:
+            self.passthroughCount += 1
+            return PassthroughCityObject(object, self.objectIDs[object.name], lastVertexIndex, source)
+        return ExportCityObject(object, self.objectIDs[object.name], lastVertexIndex, jsonExport, self.textureSetting, textureIndex)
+
+    def loadSources(self):
+        # the sources of the unchanged objects are read from the imported files before the export, objects whose file has changed since the import are rebuilt
+        # copies of an imported object are rebuilt, only the object keeping its cityJSONID is copied from the source
+        changeTracker = ChangeTracker(ImportProcess.loadSourceSettings())
+        objects = [object for object in bpy.data.objects if not object.get('cityJSONMerged') and object.get('cityJSONTemplate') is None and self.objectIDs[object.name] == object.get('cityJSONID')]
+        self.sources = changeTracker.loadSources(objects)
 
     def createCityObject(self):
-        vertexArray = []
-        blendObjects = bpy.data.objects
+        vertexArrays = []
+        cityobjects = []
         lastVertexIndex = 0
-        for object in blendObjects:
-            print("Create Export-Object: "+object.name)
-            cityobj = ExportCityObject(object, lastVertexIndex, self.jsonExport, self.textureSetting, self.textureReferenceList)
+        for object, part in self.iterExportObjects():
+            cityobj = self.createExportObject(object, part, lastVertexIndex, self.jsonExport, self.textureIndex)
             cityobj.execute()
-            for vertex in cityobj.vertices:
-                vertex[0] = round(vertex[0]/0.001)
-                vertex[1] = round(vertex[1]/0.001)
-                vertex[2] = round(vertex[2]/0.001)
-                vertexArray.append(vertex)
+            self.addAttributes(cityobj.json)
+            vertexArrays.append(self.quantizeVertices(cityobj.vertices))
             self.jsonExport["CityObjects"].update(cityobj.json)
+            if self.weldSetting:
+                cityobjects.append(cityobj)
             lastVertexIndex = cityobj.lastVertexIndex + 1
-            print("lastVertexIndex "+str(lastVertexIndex))
-        self.jsonExport['vertices'] = vertexArray
+        print("%d CityObjects have been created" % (len(self.jsonExport["CityObjects"])))
+        if vertexArrays:
+            vertices = numpy.concatenate(vertexArrays)
+            if self.weldSetting:
+                vertices = self.weldVertices(vertices, cityobjects)
+            # the vertices stay an array, the writer serializes them in chunks
+            self.jsonExport['vertices'] = vertices
+        else:
+            self.jsonExport['vertices'] = []
+
+    def weldVertices(self, vertices, cityobjects):
+        # vertices with identical integer coordinates become a single vertex
+        uniqueVertices, uniqueIndices = numpy.unique(vertices, axis=0, return_inverse=True)
+        uniqueIndices = uniqueIndices.reshape(-1)
+        # unique vertex of every loop of all objects in export order
+        loopVertices = uniqueIndices[numpy.concatenate([cityobj.boundaryIndices for cityobj in cityobjects])]
+        # the vertices are numbered in the order of their first use, unused vertices are dropped
+        usedVertices, firstUse = numpy.unique(loopVertices, return_index=True)
+        order = usedVertices[numpy.argsort(firstUse)]
+        newIndices = numpy.full(len(uniqueVertices), -1, dtype=numpy.int64)
+        newIndices[order] = numpy.arange(len(order))
+        vertexMap = newIndices[uniqueIndices]
+        for cityobj in cityobjects:
+            cityobj.setBoundaries(vertexMap[cityobj.boundaryIndices])
+        print("Welded %d vertices into %d" % (len(vertices), len(order)))
+        return uniqueVertices[order]
 
     def exportTextures(self, texture):
         fileSourceInfos = texture.filepath.split('\\')
@@ -140,10 +225,47 @@ class ExportProcess:
             os.mkdir(path)
         shutil.copy((r'%s' %src_path), (r'%s' %dst_path))
     
+    def createFeature(self, object, part=None):
+        # every feature holds its own vertices and appearance, therefore the indices start at 0
+        feature = {
+            "type": "CityJSONFeature",
+            "id": self.objectIDs[object.name] if part is None else part['id'],
+            "CityObjects": {},
+            "vertices": []
+        }
+        # the uv coordinates of every feature are indexed separately, the textures are shared
+        textureIndex = None
+        if self.textureSetting:
+            feature["appearance"] = {
+                "textures": self.jsonExport['appearance']['textures'],
+                "vertices-texture": []
+            }
+            textureIndex = TextureIndex(feature['appearance']['vertices-texture'], self.textureIndex.textures)
+        cityobj = self.createExportObject(object, part, 0, feature, textureIndex)
+        cityobj.execute()
+        self.addAttributes(cityobj.json)
+        feature["CityObjects"].update(cityobj.json)
+        feature["vertices"] = self.quantizeVertices(cityobj.vertices).tolist()
+        return feature
+
+    def writeSequence(self):
+        # the header line holds everything but the CityObjects, vertices and appearance
+        header = {key: value for key, value in self.jsonExport.items() if key != 'appearance'}
+        header['version'] = "2.0"
+        header['vertices'] = []
+        with JSONWriter(self.filepath, self.compactSetting, compression=self.compressionSetting) as writer:
+            writer.writeLine(header)
+            # every feature is written as soon as it is built
+            count = 0
+            for object, part in self.iterExportObjects():
+                writer.writeLine(self.createFeature(object, part))
+                count += 1
+        print("%d CityJSONFeatures have been written" % (count))
+
     def writeData(self):
-        with open(self.filepath, 'w', encoding='utf-8') as f:
-            filecontent = json.dumps(self.jsonExport)
-            f.write(filecontent)
+        # the document is written member by member instead of serializing it as a whole
+        with JSONWriter(self.filepath, self.compactSetting, compression=self.compressionSetting) as writer:
+            writer.writeDocument(self.jsonExport)
 
     def execute(self):
         print('##########################')
@@ -153,12 +275,23 @@ class ExportProcess:
         self.createJSONStruct()
         self.getMetadata()
         self.getTransform()
+        # placeholders of a lazy import are built before anything is exported
+        materializePlaceholders(bpy.data.objects)
         if self.textureSetting: 
             self.getTextures()
-            self.getVerticesTexture()
-        self.createCityObject()
-        self.writeData()
+        self.getTemplates()
+        self.attributes = AttributeStore.load(bpy.context.scene).getAttributes()
+        self.objectIDs = getCityObjectIDs(bpy.data.objects)
+        if self.passthroughSetting:
+            self.loadSources()
+        if self.sequenceFile:
+            self.writeSequence()
+        else:
+            self.createCityObject()
+            self.writeData()
 
+        if self.passthroughSetting:
+            print("%d unchanged objects have been copied from the source" % (self.passthroughCount))
         print('########################')
         print('### EXPORT FINISHED! ###')
         print('########################')
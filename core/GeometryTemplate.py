@@ -0,0 +1,128 @@
+import bpy
+import json
+import math
+import numpy
+from mathutils import Matrix
+from .Mesh import Mesh
+from .SurfaceAttribute import SurfaceAttribute
+
+class ImportTemplates:
+
+    def __init__(self, data, materialPalette):
+        # templates of the file and their vertices (real coordinates, not affected by the transform)
+        templates = data.get('geometry-templates', {})
+        self.templates = templates.get('templates', [])
+        self.vertices = numpy.array(templates.get('vertices-templates', []), dtype=numpy.float64).reshape(-1, 3)
+        # entire data of the file (for the materials)
+        self.data = data
+        # materials shared by all objects of the import
+        self.materialPalette = materialPalette
+        # mesh and surface table of every template, keyed by the template index
+        self.meshes = {}
+
+    def iterRings(self, boundaries, values, depth):
+        # yields every ring of the geometry with the semantic value of its surface
+        # depth is the number of nesting levels above the surfaces (0 - MultiSurface, 1 - Solid, 2 - MultiSolid)
+        for index, child in enumerate(boundaries):
+            childValues = values[index] if values is not None else None
+            if depth > 0:
+                yield from self.iterRings(child, childValues, depth - 1)
+            else:
+                for ring in child:
+                    if ring:
+                        yield childValues, ring
+
+    def getMesh(self, templateIndex, objectType):
+        # the mesh of every template is built once and shared by all of its instances, whatever their type
+        # its materials are those of the object type of the first instance
+        if templateIndex in self.meshes:
+            return self.meshes[templateIndex]
+        geom = self.templates[templateIndex]
+        depth = {'MultiSurface': 0, 'CompositeSurface': 0, 'Solid': 1, 'MultiSolid': 2, 'CompositeSolid': 2}.get(geom['type'])
+        semantics = geom.get('semantics')
+        rings = []
+        surfaceTypes = []
+        if depth is not None:
+            for value, ring in self.iterRings(geom['boundaries'], semantics['values'] if semantics is not None else None, depth):
+                rings.append(ring)
+                surfaceTypes.append(semantics['surfaces'][value]['type'] if value is not None else None)
+        else:
+            print("The template %d has the unsupported type '%s'!" % (templateIndex, geom['type']))
+        name = 'Template_%d' % (templateIndex)
+        mesh = Mesh(None, self.vertices, name)
+        mesh.vertexMaps = rings
+        newMesh = mesh.fillBlenderMesh(name, *mesh.prepareMeshArrays())
+        newMesh['cityJSONLOD'] = geom.get('lod', 0)
+        # semantics and the shared materials of the surface types
+        table = [surfaceType for surfaceType in dict.fromkeys(surfaceTypes) if surfaceType is not None]
+        slots = {}
+        for surfaceType in table:
+            newMesh.materials.append(self.materialPalette.getMaterial(objectType, surfaceType, None, self.data))
+            slots[surfaceType] = len(newMesh.materials) - 1
+        if table:
+            newMesh.polygons.foreach_set('material_index', numpy.array([slots.get(surfaceType, 0) for surfaceType in surfaceTypes], dtype=numpy.int32))
+            attribute = newMesh.attributes.new(name=SurfaceAttribute.attributeName, type='INT', domain='FACE')
+            attribute.data.foreach_set('value', numpy.array([table.index(surfaceType) if surfaceType is not None else -1 for surfaceType in surfaceTypes], dtype=numpy.int32))
+        newMesh[SurfaceAttribute.tableName] = json.dumps(table)
+        newMesh['cityJSONType'] = objectType
+        self.meshes[templateIndex] = (newMesh, table)
+        return self.meshes[templateIndex]
+
+    def createInstance(self, objID, object, geom, vertices):
+        # object that shares the mesh of the template and places it by its own matrix
+        mesh, table = self.getMesh(geom['template'], object['type'])
+        newObj = bpy.data.objects.new(objID, mesh)
+        # the template is transformed by the matrix and moved to the reference point of the instance
+        anchor = vertices[geom['boundaries'][0]].tolist()
+        values = geom.get('transformationMatrix', [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1])
+        matrix = Matrix([values[0:4], values[4:8], values[8:12], values[12:16]])
+        newObj.matrix_world = Matrix.Translation(anchor) @ matrix
+        newObj['cityJSONType'] = object['type']
+        newObj['LOD'] = math.floor(float(mesh['cityJSONLOD']))
+        newObj['cityJSONTemplate'] = geom['template']
+        newObj['cityJSONID'] = objID
+        if mesh['cityJSONType'] != object['type']:
+            # instances of other types show the materials of their own type, the mesh stays shared
+            for slot, surfaceType in zip(newObj.material_slots, table):
+                slot.link = 'OBJECT'
+                slot.material = self.materialPalette.getMaterial(object['type'], surfaceType, None, self.data)
+        return newObj
+
+class ExportTemplates:
+
+    def __init__(self):
+        # "geometry-templates" section of the exported file
+        self.json = {"templates": [], "vertices-templates": []}
+        # index of the template of every mesh datablock used by instances
+        self.templateIndex = {}
+
+    def addTemplate(self, object):
+        # the shared mesh of the instance becomes a template, every mesh is only written once
+        mesh = object.data
+        if mesh.name in self.templateIndex:
+            return self.templateIndex[mesh.name]
+        vertices = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+        mesh.vertices.foreach_get('co', vertices)
+        offset = len(self.json["vertices-templates"])
+        self.json["vertices-templates"].extend(numpy.round(vertices.reshape(-1, 3).astype(numpy.float64), 3).tolist())
+        loopVertexIndices = numpy.empty(len(mesh.loops), dtype=numpy.int32)
+        mesh.loops.foreach_get('vertex_index', loopVertexIndices)
+        loopStarts = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+        mesh.polygons.foreach_get('loop_start', loopStarts)
+        loopTotals = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+        mesh.polygons.foreach_get('loop_total', loopTotals)
+        indices = (loopVertexIndices.astype(numpy.int64) + offset).tolist()
+        # every polygon is a surface with a single ring
+        template = {
+            "type": "MultiSurface",
+            "lod": mesh.get('cityJSONLOD', object.get('LOD', 0)),
+            "boundaries": [[indices[start:start + total]] for start, total in zip(loopStarts.tolist(), loopTotals.tolist())]
+        }
+        surfaceAttribute = SurfaceAttribute(object)
+        surfaceIndices = surfaceAttribute.read()
+        if surfaceIndices is not None:
+            values, surfaces = surfaceAttribute.compactSemantics(surfaceIndices, surfaceAttribute.getTable())
+            template["semantics"] = {"values": values, "surfaces": surfaces}
+        self.templateIndex[mesh.name] = len(self.json["templates"])
+        self.json["templates"].append(template)
+        return self.templateIndex[mesh.name]
@@ -0,0 +1,39 @@
+import bpy
+import os
+
+class ImageCache:
+
+    def __init__(self, filepath):
+        # directory of the imported file, texture paths are relative to it
+        self.basepath = os.path.dirname(filepath)
+        # loaded images, keyed by (resolved path, texture index of the appearance)
+        self.images = {}
+        # loaded images, keyed by resolved path only (different texture indices may use the same file)
+        self.imagesByPath = {}
+        # number of requests which could be served from the cache
+        self.hits = 0
+        # number of requests which needed a new entry
+        self.misses = 0
+
+    def resolvePath(self, imagePath):
+        # construction of the absolute image path, CityJSON uses "/" as separator
+        return os.path.normpath(os.path.join(self.basepath, *imagePath.replace("\\", "/").split("/")))
+
+    def getImage(self, imagePath, textureIndex):
+        path = self.resolvePath(imagePath)
+        key = (path, textureIndex)
+        image = self.images.get(key)
+        if image is not None:
+            self.hits += 1
+            return image
+        self.misses += 1
+        image = self.imagesByPath.get(path)
+        if image is None:
+            # every file is only loaded and decoded once
+            image = bpy.data.images.load(path, check_existing=True)
+            self.imagesByPath[path] = image
+        self.images[key] = image
+        return image
+
+    def report(self):
+        print("Image cache: %d hits, %d misses, %d images loaded" % (self.hits, self.misses, len(self.imagesByPath)))
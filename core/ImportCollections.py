@@ -0,0 +1,60 @@
+import bpy
+
+class ImportCollections:
+
+    def __init__(self, parentName="Collection"):
+        # name of the collection holding one collection per CityObject type
+        self.parentName = parentName
+        # collection of every CityObject type used by the import, keyed by the type
+        self.collections = {}
+        # collections which are excluded from the view layer until the import is finished
+        self.excluded = []
+        # collections created by the import (removed again if it is cancelled)
+        self.created = []
+
+    def getParent(self):
+        parent = bpy.data.collections.get(self.parentName)
+        if parent is None:
+            return bpy.context.scene.collection
+        return parent
+
+    def findLayerCollection(self, layerCollection, collection):
+        # layer collection of the collection in the view layer (searched recursively)
+        if layerCollection.collection == collection:
+            return layerCollection
+        for child in layerCollection.children:
+            found = self.findLayerCollection(child, collection)
+            if found is not None:
+                return found
+        return None
+
+    def getCollection(self, objectType):
+        collection = self.collections.get(objectType)
+        if collection is None:
+            # collections of earlier imports are reused
+            parent = self.getParent()
+            collection = parent.children.get(objectType)
+            if collection is None:
+                collection = bpy.data.collections.new(objectType)
+                parent.children.link(collection)
+                self.created.append(collection)
+            # while the collection is excluded, linking objects does not resync the view layer
+            layerCollection = self.findLayerCollection(bpy.context.view_layer.layer_collection, collection)
+            if layerCollection is not None and not layerCollection.exclude:
+                layerCollection.exclude = True
+                self.excluded.append(collection)
+            self.collections[objectType] = collection
+        return collection
+
+    def link(self, object):
+        # add the new object to the collection of its type
+        self.getCollection(object['cityJSONType']).objects.link(object)
+
+    def release(self):
+        # the collections are part of the view layer again, so it is only updated once
+        viewLayer = bpy.context.view_layer
+        for collection in self.excluded:
+            layerCollection = self.findLayerCollection(viewLayer.layer_collection, collection)
+            if layerCollection is not None:
+                layerCollection.exclude = False
+        self.excluded = []
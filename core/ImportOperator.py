@@ -1,10 +1,101 @@
-from bpy.props import BoolProperty, EnumProperty, StringProperty, IntProperty
+from bpy.props import BoolProperty, EnumProperty, StringProperty, IntProperty, FloatProperty, FloatVectorProperty
 from bpy.types import Operator
 from bpy_extras.io_utils import ImportHelper
 from .ImportProcess import ImportProcess
+from .ImportPipeline import ImportPipeline
+from .ReloadProcess import ReloadProcess
+from .LazyImport import LazyImportProcess
+from .SpatialIndex import SpatialFilter, parsePolygon
+import time
+import traceback
+
+# Runs an import process in time slices, so blender stays responsive and the import can be cancelled with Esc
+class ModalImport:
+
+    # time spent on the import per timer event, the interface is redrawn in between
+    timeSlice = 0.1
+    # minimum time between two updates of the progress
+    progressInterval = 0.25
+
+    def startModal(self, context, process):
+        if context.window is None:
+            # without a window (e.g. in background mode) the import is run at once
+            return process.execute()
+        self.process = process
+        self.steps = None
+        self.total = None
+        self.lastProgress = 0.0
+        windowManager = context.window_manager
+        self.timer = windowManager.event_timer_add(0.01, window=context.window)
+        windowManager.modal_handler_add(self)
+        windowManager.progress_begin(0, 100)
+        context.workspace.status_text_set("Reading CityJSON file...")
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            return self.cancelImport(context)
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        try:
+            if self.steps is None:
+                # reading the file cannot be split, the status bar only shows that it is running
+                self.process.prepare()
+                self.total = self.process.countCityObjects()
+                self.steps = self.process.iterCreateCityObjects()
+                return {'RUNNING_MODAL'}
+            deadline = time.time() + self.timeSlice
+            while time.time() < deadline:
+                if next(self.steps) is ImportPipeline.waiting:
+                    # the worker has not prepared the next CityObject yet, the events are handled until the next timer event
+                    break
+        except StopIteration:
+            return self.finishImport(context)
+        except Exception as error:
+            traceback.print_exc()
+            self.cancelImport(context)
+            self.report({'ERROR'}, "The import failed: %s" % (error))
+            return {'CANCELLED'}
+        self.updateProgress(context)
+        return {'RUNNING_MODAL'}
+
+    def updateProgress(self, context):
+        # the progress is only updated a few times per second
+        now = time.time()
+        if now - self.lastProgress < self.progressInterval:
+            return
+        self.lastProgress = now
+        # the total counts all CityObjects of the file, so the progress is given by the scanned ones (the filters may skip some of them)
+        scanned = self.process.scannedCount
+        if self.total:
+            context.window_manager.progress_update(min(100, int(100 * scanned / self.total)))
+            context.workspace.status_text_set("Importing CityJSON: %d / %d CityObjects scanned, %d imported (Esc to cancel)" % (scanned, self.total, self.process.importedCount))
+        else:
+            context.workspace.status_text_set("Importing CityJSON: %d CityObjects scanned, %d imported (Esc to cancel)" % (scanned, self.process.importedCount))
+
+    def endModal(self, context):
+        windowManager = context.window_manager
+        windowManager.event_timer_remove(self.timer)
+        windowManager.progress_end()
+        context.workspace.status_text_set(None)
+
+    def finishImport(self, context):
+        self.endModal(context)
+        self.process.finish()
+        self.report({'INFO'}, "Imported %d of %d scanned CityObjects" % (self.process.importedCount, self.process.scannedCount))
+        return {'FINISHED'}
+
+    def cancelImport(self, context):
+        # everything created so far is removed again
+        if self.steps is not None:
+            self.steps.close()
+        self.process.rollback()
+        self.endModal(context)
+        self.report({'WARNING'}, "The import has been cancelled")
+        return {'CANCELLED'}
 
 # Import Operator
-class ImportCityJSON(Operator, ImportHelper):
+class ImportCityJSON(ModalImport, Operator, ImportHelper):
 
     # Operator Metadata
     bl_idname = "cityjson.import_file"
@@ -12,7 +103,7 @@ class ImportCityJSON(Operator, ImportHelper):
     filename_ext = ".json"
 
     filter_glob: StringProperty(
-        default="*.json",
+        default="*.json;*.jsonl;*.json.gz;*.jsonl.gz;*.json.xz;*.jsonl.xz",
         options={'HIDDEN'},
         maxlen=255,  # Max internal buffer length, longer would be clamped.
     )
@@ -23,8 +114,143 @@ class ImportCityJSON(Operator, ImportHelper):
         description="Choose if textures present in the CityJSON file should be imported",
         default=True,
     )
+
+    streaming_setting: BoolProperty(
+        name="Stream CityObjects",
+        description="Read the CityObjects one at a time instead of loading the whole file into memory (for very large files)",
+        default=False,
+    )
     
+    tracking_setting: BoolProperty(
+        name="Keep Source Data",
+        description="Keep a reference to the original JSON of every CityObject, so unchanged objects are copied from the file on export",
+        default=True,
+    )
+
+    lod_setting: EnumProperty(
+        name="Level of Detail",
+        description="Choose which geometry of every CityObject should be imported",
+        items=(
+            ('ALL', "All", "Import all geometries of every CityObject"),
+            ('HIGHEST', "Highest", "Import only the geometry with the highest LOD of every CityObject"),
+            ('LOWEST', "Lowest", "Import only the geometry with the lowest LOD of every CityObject"),
+            ('VALUE', "Specific LOD", "Import only the geometry with the given LOD, CityObjects without it are skipped"),
+        ),
+        default='ALL',
+    )
+
+    lod_value: FloatProperty(
+        name="LOD",
+        description="LOD to import if 'Specific LOD' is chosen",
+        default=2.0,
+        min=0.0,
+        max=4.0,
+        precision=1,
+        step=10,
+    )
+
+    lazy_setting: BoolProperty(
+        name="Placeholders Only",
+        description="Create bounding boxes for the CityObjects, their full geometry is built when they are selected, edited or exported",
+        default=False,
+    )
+
+    merge_setting: EnumProperty(
+        name="Merge Objects",
+        description="Choose if the CityObjects should be merged into a few large meshes (for city-scale files)",
+        items=(
+            ('NONE', "None", "Create one object per CityObject"),
+            ('TYPE', "Per Type", "Create one object per CityObject type"),
+            ('TILE', "Per Tile", "Create one object per square tile"),
+        ),
+        default='NONE',
+    )
+
+    tile_size: FloatProperty(
+        name="Tile Size",
+        description="Edge length of the tiles in the units of the file's reference system, if the objects are merged per tile",
+        default=500.0,
+        min=1.0,
+    )
+
+    filter_mode: EnumProperty(
+        name="Spatial Filter",
+        description="Choose if only the CityObjects inside of an area should be imported",
+        items=(
+            ('NONE', "None", "Import all CityObjects"),
+            ('BBOX', "Bounding Box", "Import the CityObjects intersecting the bounding box"),
+            ('POLYGON', "Polygon", "Import the CityObjects intersecting the polygon"),
+        ),
+        default='NONE',
+    )
+
+    filter_bbox: FloatVectorProperty(
+        name="Bounding Box",
+        description="Area to import in the coordinates of the file's reference system (min X, min Y, max X, max Y)",
+        size=4,
+        precision=3,
+        default=(0.0, 0.0, 0.0, 0.0),
+    )
+
+    filter_polygon: StringProperty(
+        name="Polygon",
+        description="Area to import in the coordinates of the file's reference system, given as 'x y, x y, ...' or as WKT polygon",
+        default="",
+    )
+
+    def getSpatialFilter(self):
+        if self.filter_mode == 'BBOX':
+            return SpatialFilter(bbox=tuple(self.filter_bbox))
+        if self.filter_mode == 'POLYGON':
+            return SpatialFilter(polygon=parsePolygon(self.filter_polygon))
+        return None
+
     # Operator Main Method (Import-Process)
     def execute(self, context):
-        importAndParse = ImportProcess(self.filepath, self.texture_setting)
-        return importAndParse.execute()
\ No newline at end of file
+        try:
+            spatialFilter = self.getSpatialFilter()
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        if self.lazy_setting:
+            lazyImport = LazyImportProcess(self.filepath, self.texture_setting, self.tracking_setting, spatialFilter, self.lod_setting, self.lod_value)
+            return self.startModal(context, lazyImport)
+        importAndParse = ImportProcess(self.filepath, self.texture_setting, self.streaming_setting, self.tracking_setting, spatialFilter, self.lod_setting, self.lod_value, self.merge_setting, self.tile_size)
+        return self.startModal(context, importAndParse)
+
+# Reload Operator
+class ReloadCityJSON(ModalImport, Operator, ImportHelper):
+
+    # Operator Metadata
+    bl_idname = "cityjson.reload_file"
+    bl_label = "Reload CityJSON"
+    bl_description = "Update the objects imported from a CityJSON file, only the CityObjects that changed in the file are rebuilt"
+    filename_ext = ".json"
+
+    filter_glob: StringProperty(
+        default="*.json;*.jsonl;*.json.gz;*.jsonl.gz;*.json.xz;*.jsonl.xz",
+        options={'HIDDEN'},
+        maxlen=255,  # Max internal buffer length, longer would be clamped.
+    )
+
+    # List of Operator properties
+    texture_setting: BoolProperty(
+        name="Import Textures",
+        description="Choose if textures present in the CityJSON file should be imported",
+        default=True,
+    )
+
+    streaming_setting: BoolProperty(
+        name="Stream CityObjects",
+        description="Read the CityObjects one at a time instead of loading the whole file into memory (for very large files)",
+        default=False,
+    )
+
+    # Operator Main Method (Reload-Process)
+    def execute(self, context):
+        reloadProcess = ReloadProcess(self.filepath, self.texture_setting, self.streaming_setting)
+        error = reloadProcess.getReloadError()
+        if error is not None:
+            self.report({'ERROR'}, error)
+            return {'CANCELLED'}
+        return self.startModal(context, reloadProcess)
\ No newline at end of file
@@ -0,0 +1,87 @@
+import queue
+import threading
+from .Mesh import Mesh
+
+class ImportPipeline:
+
+    # marks the end of the prepared CityObjects in the queue
+    endMarker = None
+    # yielded instead of a CityObject while the worker has not prepared the next one yet, so the caller is never blocked
+    waiting = (None, None)
+
+    def __init__(self, process, queueSize):
+        # import process whose CityObjects are read and prepared
+        self.process = process
+        # CityObjects with their prepared mesh arrays, the worker waits once it is full
+        self.queue = queue.Queue(maxsize=queueSize)
+        # set if the consumer stops early (e.g. the import is cancelled)
+        self.stopEvent = threading.Event()
+        # error raised by the worker, which is raised again in the main thread
+        self.error = None
+        # the worker never touches blender data, the datablocks are created by the main thread
+        self.worker = threading.Thread(target=self.produce, name='CityJSON import preparation', daemon=True)
+
+    def prepareMesh(self, objID, object, vertices):
+        # vertices, loops and faces of the mesh of the CityObject, None for instances of templates
+        if self.process.getInstanceGeometry(object) is not None:
+            return None
+        mesh = Mesh(object, vertices, objID)
+        mesh.extractVertexMapping()
+        return mesh.prepareMeshArrays()
+
+    def put(self, item):
+        # wait for free space in the queue, returns False if the pipeline has been stopped
+        while not self.stopEvent.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(self):
+        # next item of the queue, the waiting marker if it is empty while the worker is still running
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            if self.worker.is_alive():
+                return self.waiting
+        # the worker may have put its last item right before it ended
+            try:
+                return self.queue.get_nowait()
+            except queue.Empty:
+                if self.error is not None:
+                    raise self.error
+                raise RuntimeError("The preparation of the CityObjects stopped unexpectedly")
+
+    def produce(self):
+        # reading, decoding, filtering and meshing of the CityObjects
+        preparedObjects = self.process.iterPreparedCityObjects()
+        try:
+            for prepared in preparedObjects:
+                objID, object, vertices = prepared[:3]
+                if not self.put((prepared, self.prepareMesh(objID, object, vertices))):
+                    return
+        except Exception as error:
+            self.error = error
+        finally:
+            preparedObjects.close()
+        self.put(self.endMarker)
+
+    def stop(self):
+        self.stopEvent.set()
+        self.worker.join()
+
+    def __iter__(self):
+        # yields the prepared CityObjects and their mesh arrays in the order of the file, and the waiting marker in between
+        self.worker.start()
+        try:
+            while True:
+                item = self.get()
+                if item is self.endMarker:
+                    break
+                yield item
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.stop()
@@ -1,17 +1,40 @@
 import json
 import bpy
+import math
+import numpy
 from .CityObject import ImportCityObject, ExportCityObject
+from .JSONStream import JSONStream
+from .JSONWriter import openFile, stripCompression
+from .MaterialPalette import MaterialPalette
+from .ChangeTracker import ChangeTracker
+from .SourceReader import getSourceStamp, selectLOD
+from .SpatialIndex import SpatialIndex, SpatialFilter
+from .MergedMesh import MergedMesh
+from .GeometryTemplate import ImportTemplates
+from .ImportPipeline import ImportPipeline
+from .ImportCollections import ImportCollections
+from .AttributeStore import AttributeStore
+from .CityObjectIndex import resetIndex
 import time
 
 class ImportProcess:
 
-    def __init__(self, filepath, textureSetting):
+    # kinds of datablocks created by an import, in the order they are removed if it is cancelled (objects first, so the data is not in use anymore)
+    snapshotCollections = ('objects', 'collections', 'meshes', 'materials', 'images')
+    # number of CityObjects whose meshes are prepared ahead of their creation
+    preparationQueueSize = 64
+    # True - the materials of earlier imports are reused (see MaterialPalette)
+    reuseMaterials = False
+    # custom property of the scene holding the settings of every imported file (JSON, keyed by the normalized path)
+    settingsProperty = 'cityJSONImports'
+
+    def __init__(self, filepath, textureSetting, streamingSetting=False, trackingSetting=False, spatialFilter=None, lodSetting='ALL', lodValue=2.0, mergeSetting='NONE', tileSize=500.0):
         # File to be imported
         self.filepath = filepath
         # Content of imported file
         self.data = []
-        # Vertices of imported files geometry for further use in blenders objects
-        self.vertices = []
+        # Vertices of imported files geometry for further use in blenders objects (numpy array of shape (n, 3))
+        self.vertices = None
         # Translation parameters / world origin
         self.worldOrigin = []
         # Scale parameters
@@ -20,13 +43,149 @@ class ImportProcess:
         # True - import textures
         # False - do not import textures
         self.textureSetting = textureSetting
+        # Import-setting which lets the user choose if the CityObjects should be read one at a time
+        # True - the CityObjects are streamed from the file and are never held in memory all at once
+        # False - the whole file is loaded at once
+        self.streamingSetting = streamingSetting
+        # Import-setting which lets the user choose if the original JSON of every CityObject should be kept
+        # True - unchanged objects can be copied from the source on export
+        # False - every object is rebuilt from its mesh on export
+        self.trackingSetting = trackingSetting
+        # stores the source of the CityObjects and the hashes of the created objects
+        self.changeTracker = ChangeTracker()
+        # real world coordinates of the vertices (only kept if changes are tracked)
+        self.sourceVertices = None
+        # CityJSONSeq (JSON Lines) files consist of a header line followed by one CityJSONFeature per line
+        self.sequenceFile = stripCompression(filepath).lower().endswith('.jsonl')
+        # reader of the file in streaming or sequence mode
+        self.stream = None
+        # length of the header line of a CityJSONSeq file
+        self.sequenceOffset = 0
+        # byte range of the source of every CityObject, the line of its feature in a CityJSONSeq file (only kept if changes are tracked)
+        self.featureRanges = {}
+        # byte ranges of the transform and the vertices of a CityJSON document (only kept if changes are tracked)
+        self.sourceRanges = None
+        # ID and byte range of every CityObject in the file (streaming mode, or CityJSON documents whose changes are tracked)
+        self.cityObjectIndex = []
+        # materials shared by all objects of the import (one per object type and surface type)
+        self.materialPalette = MaterialPalette(textureSetting, filepath, self.reuseMaterials)
         # vertices before scaling
-        self.unScaledVertices = []
+        self.unScaledVertices = None
+        # offset subtracted from the vertices before scaling (only for files without transform property)
+        self.vertexOffset = None
+        # translation of the vertices of the file to real world coordinates
+        self.sourceTranslate = None
+        # difference between the origin of the file and the origin established by the first import
+        self.originDelta = numpy.zeros(3, dtype=numpy.float64)
+        # Import-setting which restricts the import to the CityObjects inside of a bounding box or polygon (CRS coordinates)
+        # None - all CityObjects are imported
+        self.spatialFilter = spatialFilter
+        # Import-setting which lets the user choose which geometry of every CityObject should be imported
+        # 'ALL' - all geometries are imported
+        # 'HIGHEST' / 'LOWEST' - only the geometry with the highest / lowest LOD
+        # 'VALUE' - only the geometry with the LOD given by lodValue, objects without it are skipped
+        self.lodSetting = lodSetting
+        self.lodValue = lodValue
+        # Import-setting which lets the user choose if the CityObjects should be merged into a few large meshes
+        # 'NONE' - one blender object per CityObject
+        # 'TYPE' - one blender object per CityObject type
+        # 'TILE' - one blender object per square tile of tileSize (CRS units)
+        self.mergeSetting = mergeSetting
+        self.tileSize = tileSize
+        # merged meshes being built, keyed by their name
+        self.mergedMeshes = {}
+        # meshes of the geometry templates, which are shared by their instances (created when the first instance is found)
+        self.templates = None
+        # collections the new objects are linked to (one per CityObject type)
+        self.collections = ImportCollections()
+        # IDs and attributes of the imported CityObjects, which are added to the attribute store of the scene at the end
+        self.attributeIDs = []
+        self.attributeList = []
+        # IDs of the CityObjects which have been removed from the scene (reload only)
+        self.removedIDs = []
+        # number of CityObjects read from the file so far, including those skipped by the filters (for the progress)
+        self.scannedCount = 0
+        # number of CityObjects created so far (counted on the main thread, the worker reads ahead)
+        self.importedCount = 0
+        # datablocks that existed before the import, the datablocks created by the import are removed if it is cancelled
+        self.snapshot = {}
+        # True if the world parameters have been set by this import
+        self.firstImport = False
+        # start time of the import
+        self.timeStart = None
+        # 2D extents of the CityObjects taken from their geographicalExtent while the file is indexed (streaming mode only)
+        self.cityObjectExtents = {}
+        # IDs of the CityObjects whose extent is part of the spatial index and IDs of those that intersect the filter
+        self.indexedIDs = set()
+        self.selectedIDs = set()
 
     def load_data(self):
-        # load contents of file 
-        with open(self.filepath) as json_file:
-            self.data = json.load(json_file)
+        if self.sequenceFile:
+            # the first line holds the transform and metadata, the features are read one at a time later on
+            self.stream = openFile(self.filepath, 'rb')
+            header = self.stream.readline()
+            self.data = json.loads(header)
+            self.sequenceOffset = len(header)
+        elif self.streamingSetting:
+            # read everything but the CityObjects, which are only indexed by their position in the file
+            self.stream = JSONStream(self.filepath)
+            self.stream.open()
+            onIndex = self.storeObjectExtent if self.spatialFilter is not None else None
+            self.data, self.cityObjectIndex = self.stream.readDocument('CityObjects', onIndex)
+            self.storeSourceRanges(self.stream)
+            print('Indexed %d CityObjects for streaming import!' % len(self.cityObjectIndex))
+        elif self.trackingSetting:
+            # the CityObjects are decoded while their byte ranges are recorded, so the export can read them again without indexing the file
+            cityObjects = {}
+            with JSONStream(self.filepath) as stream:
+                self.data, self.cityObjectIndex = stream.readDocument('CityObjects', cityObjects.__setitem__)
+                self.data['CityObjects'] = cityObjects
+                self.storeSourceRanges(stream)
+        else:
+            # load contents of file 
+            with openFile(self.filepath, 'r') as json_file:
+                self.data = json.load(json_file)
+
+    def storeSourceRanges(self, stream):
+        # byte ranges of the sources of a CityJSON document, which are stored with the objects and the import settings
+        if not self.trackingSetting:
+            return
+        self.featureRanges = {objID: (start, end) for objID, start, end in self.cityObjectIndex}
+        self.sourceRanges = {key: stream.memberRanges[key] for key in ('transform', 'vertices') if key in stream.memberRanges}
+
+    def iterCityObjects(self):
+        # yields the ID, the content, the vertices and the data holding the appearance of every CityObject in the file
+        if self.sequenceFile:
+            try:
+                start = self.sequenceOffset
+                for line in self.stream:
+                    end = start + len(line)
+                    if line.strip():
+                        # every feature has its own vertices and appearance
+                        feature = json.loads(line)
+                        vertices = self.scaleFeatureVertices(feature['vertices'])
+                        for objID, object in feature['CityObjects'].items():
+                            self.scannedCount += 1
+                            if self.trackingSetting:
+                                self.featureRanges[objID] = (start, end)
+                            yield objID, object, vertices, feature
+                    start = end
+            finally:
+                self.stream.close()
+        elif self.streamingSetting:
+            try:
+                for objID, start, end in self.cityObjectIndex:
+                    self.scannedCount += 1
+                    # objects outside of the spatial filter are not even read
+                    if objID in self.indexedIDs and objID not in self.selectedIDs:
+                        continue
+                    yield objID, self.stream.readValue(start, end), self.vertices, self.data
+            finally:
+                self.stream.close()
+        else:
+            for objID, object in self.data['CityObjects'].items():
+                self.scannedCount += 1
+                yield objID, object, self.vertices, self.data
 
     def getTransformationParameters(self):
 
@@ -46,14 +205,10 @@ class ImportProcess:
             # scale factor is 1 since the values are in meters (with decimals)
             scale = [1, 1, 1]
             self.scaleParam = scale
-            
-            # apply transform values to all vertices
-            for vertex in self.data['vertices']:
-                x = vertex[0]-bboxXmin
-                y = vertex[1]-bboxYmin
-                z = vertex[2]-bboxZmin
-                self.unScaledVertices.append([x,y,z])
-
+            # the translation has to be subtracted from all vertices
+            self.vertexOffset = numpy.array(translate, dtype=numpy.float64)
+            # the vertices already are real world coordinates
+            self.sourceTranslate = numpy.zeros(3, dtype=numpy.float64)
 
         else:
             # if it exists, use it
@@ -65,20 +220,38 @@ class ImportProcess:
             for param in self.data['transform']['scale']:
                 self.scaleParam.append(param)
             # no need for processing of the vertices so they are just send along "as is "
-            for vertex in self.data['vertices']:
-                x = vertex[0]
-                y = vertex[1]
-                z = vertex[2]
-                self.unScaledVertices.append([x,y,z])           
-            
+            self.vertexOffset = numpy.zeros(3, dtype=numpy.float64)
+            # translation which turns the scaled vertices into real world coordinates
+            self.sourceTranslate = numpy.array(self.worldOrigin, dtype=numpy.float64)
+
+        # load the vertices into a single array and drop the list from the parsed file
+        self.unScaledVertices = self.loadVertexArray(self.data['vertices'])
+        self.data['vertices'] = None
+
+    def loadVertexArray(self, vertices):
+        # integer vertices of transformed files are loaded as int32 if they fit, real world coordinates as float64
+        vertexArray = numpy.array(vertices, dtype=numpy.float64).reshape(-1, 3)
+        if 'transform' in self.data and vertexArray.size and numpy.abs(vertexArray).max() <= numpy.iinfo(numpy.int32).max:
+            vertexArray = vertexArray.astype(numpy.int32)
+        return vertexArray
 
     def scaleVertexCoordinates(self):
-        # apply scale factor to vertices
-        for vertex in self.unScaledVertices:
-            x = round(vertex[0]*self.scaleParam[0],3)
-            y = round(vertex[1]*self.scaleParam[1],3)
-            z = round(vertex[2]*self.scaleParam[2],3)
-            self.vertices.append([x,y,z])
+        # apply translation and scale factor to all vertices at once
+        scale = numpy.array(self.scaleParam, dtype=numpy.float64)
+        self.vertices = numpy.round((self.unScaledVertices - self.vertexOffset) * scale, 3)
+        if self.trackingSetting:
+            self.sourceVertices = self.realWorldVertices(self.unScaledVertices)
+        # the unscaled vertices are not needed anymore
+        self.unScaledVertices = None
+
+    def realWorldVertices(self, unScaledVertices):
+        # unscaled vertices of the file in real world coordinates (full precision)
+        return unScaledVertices * numpy.array(self.scaleParam, dtype=numpy.float64) + self.sourceTranslate
+
+    def scaleFeatureVertices(self, vertices):
+        # the local vertices of a CityJSONFeature share the transform of the header
+        scale = numpy.array(self.scaleParam, dtype=numpy.float64)
+        return numpy.round((self.loadVertexArray(vertices) - self.vertexOffset) * scale, 3) + self.originDelta
 
     def checkImport(self):
         # checks if this is the first imported CityJSON file
@@ -90,35 +263,13 @@ class ImportProcess:
             return True
         else: 
             print('This is NOT the first file!')
-            # load the x-origin set in the project
-            establishedX = bpy.context.scene.world['X_Origin']
-            # load the x-origin of the import file
-            currentX = self.worldOrigin[0]
-            # calculate the difference
-            deltaX = currentX - establishedX
-            # apply the difference to all coordinates
-            for vertex in self.vertices:
-                vertex[0] = vertex[0] + deltaX
-            
-            # load the y-origin set in the project
-            establishedY = bpy.context.scene.world['Y_Origin']
-            # load the y-origin of the import file
-            currentY = self.worldOrigin[1]
-            # calculate the difference
-            deltaY = currentY - establishedY
-            # apply the difference to all coordinates
-            for vertex in self.vertices:
-                vertex[1] = vertex[1] + deltaY
-
-            # load the z-origin set in the project
-            establishedZ = bpy.context.scene.world['Z_Origin']
-            # load the z-origin of the import file
-            currentZ = self.worldOrigin[2]
-            # calculate the difference
-            deltaZ = currentZ - establishedZ
-            # apply the difference to all coordinates
-            for vertex in self.vertices:
-                vertex[2] = vertex[2] + deltaZ
+            # load the origin set in the project
+            established = numpy.array([bpy.context.scene.world['X_Origin'], bpy.context.scene.world['Y_Origin'], bpy.context.scene.world['Z_Origin']], dtype=numpy.float64)
+            # load the origin of the import file
+            current = numpy.array(self.worldOrigin, dtype=numpy.float64)
+            # calculate the difference and apply it to all coordinates
+            self.originDelta = current - established
+            self.vertices += self.originDelta
             return False
 
     def createWorldProperties(self):
@@ -128,24 +279,262 @@ class ImportProcess:
         bpy.context.scene.world['Z_Origin'] = self.worldOrigin[2]
         print("World parameters have been set!")
 
-    def createCityObjects(self):
-        # create the CityObjects with coresponding meshesS
-        cityobjects = self.data['CityObjects'] #variable is a dict
-        for objID, object in cityobjects.items():
-            print('Creating object: '+ objID)
-            cityobj = ImportCityObject(object, self.vertices, objID, self.textureSetting, self.data, self.filepath)
+    def storeObjectExtent(self, objID, object):
+        # keep the extent of every indexed CityObject that has a geographicalExtent
+        if 'geographicalExtent' in object:
+            extent = object['geographicalExtent']
+            self.cityObjectExtents[objID] = (extent[0], extent[1], extent[3], extent[4])
+
+    def objectExtent(self, object, vertices):
+        # 2D extent of a CityObject in CRS coordinates, taken from its geographicalExtent or from the bounds of its vertices
+        if 'geographicalExtent' in object:
+            extent = object['geographicalExtent']
+            return (extent[0], extent[1], extent[3], extent[4])
+        indices = numpy.fromiter((index for geom in object.get('geometry', []) for index in self.changeTracker.iterIndices(geom['boundaries'])), dtype=numpy.int64)
+        if len(indices) == 0:
+            return None
+        # the vertices are relative to the origin of the scene
+        points = vertices[indices, :2] - self.originDelta[:2] + numpy.array(self.worldOrigin[:2], dtype=numpy.float64)
+        return tuple(points.min(axis=0).tolist() + points.max(axis=0).tolist())
+
+    def buildSpatialIndex(self):
+        # find the CityObjects intersecting the spatial filter before any of them is created
+        # CityJSONSeq features are tested one by one while they are read
+        if self.spatialFilter is None or self.sequenceFile:
+            return
+        if self.streamingSetting:
+            extents = self.cityObjectExtents
+        else:
+            extents = {}
+            for objID, object in self.data['CityObjects'].items():
+                extent = self.objectExtent(object, self.vertices)
+                if extent is not None:
+                    extents[objID] = extent
+        spatialIndex = SpatialIndex(extents.keys(), list(extents.values()))
+        self.indexedIDs = set(extents.keys())
+        self.selectedIDs = spatialIndex.query(self.spatialFilter)
+        print('%d of %d indexed CityObjects intersect the filter!' % (len(self.selectedIDs), len(self.indexedIDs)))
+
+    def selectGeometry(self, object):
+        # drop all geometries of the CityObject except for the one with the chosen LOD, returns False if there is none
+        return selectLOD(object, self.lodSetting, self.lodValue)
+
+    def acceptCityObject(self, objID, object, vertices):
+        # True if the CityObject is part of the import
+        if self.spatialFilter is None:
+            return True
+        if objID in self.indexedIDs:
+            return objID in self.selectedIDs
+        extent = self.objectExtent(object, vertices)
+        return extent is not None and self.spatialFilter.intersects(extent)
+
+    def loadTextureVertices(self, data):
+        # array of the uv coordinates of the appearance
+        if not self.textureSetting:
+            return None
+        try:
+            textureVertices = data['appearance']['vertices-texture']
+        except KeyError:
+            return None
+        return numpy.array(textureVertices, dtype=numpy.float32).reshape(-1, 2)
+
+    def iterPreparedCityObjects(self):
+        # yields every CityObject together with the data prepared for its file (or feature of a CityJSONSeq file)
+        # in streaming mode every object is read just before and released right after its creation
+        lastData = None
+        sourceVertices = None
+        for objID, object, vertices, data in self.iterCityObjects():
+            if not self.selectGeometry(object) or not self.acceptCityObject(objID, object, vertices):
+                continue
+            # the uv coordinates are converted once per file (or once per feature of a CityJSONSeq file)
+            if data is not lastData:
+                textureVertices = self.loadTextureVertices(data)
+                if self.trackingSetting:
+                    sourceVertices = self.sourceVertices if data is self.data else self.realWorldVertices(self.loadVertexArray(data['vertices']))
+                lastData = data
+            yield objID, object, vertices, data, textureVertices, sourceVertices
+
+    def storeAttributes(self, objID, attributes):
+        # called on the main thread for every CityObject that is created (or replaced by a reload)
+        self.attributeIDs.append(objID)
+        self.attributeList.append(attributes or {})
+
+    def saveAttributes(self):
+        # the attributes of all CityObjects of the scene are kept in a single table
+        scene = bpy.context.scene
+        store = AttributeStore.load(scene)
+        store.remove(self.removedIDs)
+        store.update(self.attributeIDs, self.attributeList)
+        store.save(scene)
+        resetIndex()
+        print('Stored the attributes of %d CityObjects (%d keys)!' % (len(self.attributeIDs), len(store.columns)))
+
+    def getInstanceGeometry(self, object):
+        # the GeometryInstance of the CityObject, None if it has a geometry of its own
+        instances = [geom for geom in object.get('geometry', []) if geom['type'] == 'GeometryInstance']
+        if not instances:
+            return None
+        if len(instances) < len(object['geometry']):
+            print('Only the first GeometryInstance of the object is imported!')
+        return instances[0]
+
+    def createInstanceObject(self, objID, object, geom, vertices):
+        # the templates are read from the file (or the header of a CityJSONSeq file)
+        if self.templates is None:
+            self.templates = ImportTemplates(self.data, self.materialPalette)
+        return self.templates.createInstance(objID, object, geom, vertices)
+
+    def iterPreparedMeshes(self):
+        # yields the prepared CityObjects together with the arrays of their meshes
+        # reading, decoding and meshing run in a worker thread, while the main thread creates the blender data
+        return ImportPipeline(self, self.preparationQueueSize)
+
+    def createCityObject(self, objID, object, vertices, data, textureVertices, sourceVertices, meshArrays=None):
+        instance = self.getInstanceGeometry(object)
+        if instance is not None:
+            # instances share the mesh of their template
+            newObject = self.createInstanceObject(objID, object, instance, vertices)
+        else:
+            cityobj = ImportCityObject(object, vertices, objID, self.textureSetting, data, self.filepath, self.materialPalette, textureVertices, meshArrays)
             cityobj.execute()
-        print('All CityObjects have been created!')
+            newObject = cityobj.newObject
+        if self.trackingSetting:
+            # keep a reference to the original JSON of the object, so it can be copied on export or skipped on reload if it does not change
+            self.changeTracker.storeSource(newObject, objID, self.filepath, object, vertices, sourceVertices, self.featureRanges.pop(objID, None), [self.lodSetting, self.lodValue])
+        return newObject
 
-    def execute(self):
-        time_start = time.time()
-        bpy.ops.wm.console_toggle()
+    def getMergedMesh(self, object, vertices):
+        # merged mesh the CityObject belongs to
+        if self.mergeSetting == 'TYPE':
+            name = 'Merged_' + object['type']
+        else:
+            extent = self.objectExtent(object, vertices)
+            if extent is None:
+                return None
+            # tile of the center of the object
+            column = math.floor((extent[0] + extent[2]) / 2 / self.tileSize)
+            row = math.floor((extent[1] + extent[3]) / 2 / self.tileSize)
+            name = 'Tile_%d_%d' % (column, row)
+        mergedMesh = self.mergedMeshes.get(name)
+        if mergedMesh is None:
+            mergedMesh = MergedMesh(name, self.materialPalette)
+            self.mergedMeshes[name] = mergedMesh
+        return mergedMesh
+
+    def iterCreateMergedObjects(self):
+        # the CityObjects are collected into a few meshes, which are created at the end
+        for prepared, meshArrays in self.iterPreparedMeshes():
+            if prepared is None:
+                yield ImportPipeline.waiting
+                continue
+            objID, object, vertices, data, textureVertices, sourceVertices = prepared
+            self.storeAttributes(objID, object.get('attributes'))
+            # instances keep sharing the mesh of their template
+            if self.getInstanceGeometry(object) is not None:
+                self.collections.link(self.createCityObject(objID, object, vertices, data, textureVertices, sourceVertices))
+                self.importedCount += 1
+                yield
+                continue
+            mergedMesh = self.getMergedMesh(object, vertices)
+            if mergedMesh is not None:
+                mergedMesh.addCityObject(objID, object, vertices, data, meshArrays)
+                self.importedCount += 1
+            yield
+        for mergedMesh in self.mergedMeshes.values():
+            if mergedMesh.objectIDs:
+                self.collections.link(mergedMesh.createObject())
+        print('All CityObjects have been merged into %d objects!' % (len(self.mergedMeshes)))
+
+    def iterCreateCityObjects(self):
+        # creates the CityObjects one by one, the caller gets back control after every object
+        if self.mergeSetting != 'NONE':
+            yield from self.iterCreateMergedObjects()
+            return
+        # create the CityObjects with coresponding meshesS
+        for prepared, meshArrays in self.iterPreparedMeshes():
+            if prepared is None:
+                # the worker has not prepared the next CityObject yet
+                yield ImportPipeline.waiting
+                continue
+            self.storeAttributes(prepared[0], prepared[1].get('attributes'))
+            self.collections.link(self.createCityObject(*prepared, meshArrays))
+            self.importedCount += 1
+            del prepared, meshArrays
+            yield
+        print('%d CityObjects have been created!' % (self.importedCount))
+
+    def createCityObjects(self):
+        for step in self.iterCreateCityObjects():
+            if step is ImportPipeline.waiting:
+                # without a window there is nothing else to do, the worker gets the time
+                time.sleep(0.001)
+
+    def countCityObjects(self):
+        # number of CityObjects in the file (before filtering), None if it is not known in advance (CityJSONSeq)
+        if self.sequenceFile:
+            return None
+        if self.streamingSetting:
+            return len(self.cityObjectIndex)
+        return len(self.data['CityObjects'])
+
+    def takeSnapshot(self):
+        self.snapshot = {name: {datablock.as_pointer() for datablock in getattr(bpy.data, name)} for name in self.snapshotCollections}
+
+    def getCreatedDatablocks(self):
+        # datablocks the import may have created, keyed by their collection in bpy.data
+        objects = [object for collection in self.collections.collections.values() for object in collection.objects]
+        meshes = [object.data for object in objects if object.type == 'MESH']
+        if self.templates is not None:
+            meshes += [mesh for mesh, table in self.templates.meshes.values()]
+        materials = list(self.materialPalette.materials.values())
+        materials += [slot.material for object in objects for slot in object.material_slots]
+        materials += [material for mesh in meshes for material in mesh.materials]
+        return {
+            'objects': objects,
+            'collections': self.collections.created,
+            'meshes': meshes,
+            'materials': materials,
+            'images': list(self.materialPalette.imageCache.imagesByPath.values()),
+        }
+
+    def rollback(self):
+        # remove everything the import has created so far, datablocks created by the user in the meantime are kept
+        if not self.snapshot:
+            return
+        self.collections.release()
+        removed = 0
+        created = self.getCreatedDatablocks()
+        for name in self.snapshotCollections:
+            collection = getattr(bpy.data, name)
+            datablocks = {datablock.as_pointer(): datablock for datablock in created[name] if datablock is not None}
+            for pointer, datablock in datablocks.items():
+                # datablocks that existed before the import (e.g. reused materials or images) are kept
+                if pointer in self.snapshot[name]:
+                    continue
+                collection.remove(datablock)
+                if name == 'objects':
+                    removed += 1
+        if self.firstImport:
+            for key in ('CRS', 'X_Origin', 'Y_Origin', 'Z_Origin'):
+                if key in bpy.context.scene.world:
+                    del bpy.context.scene.world[key]
+        if self.stream is not None:
+            self.stream.close()
+        print('The import has been cancelled, %d objects have been removed!' % (removed))
+
+    def cleanUp(self):
+        # clean up unused objects
+        bpy.ops.outliner.orphans_purge(do_local_ids=True, do_linked_ids=False, do_recursive=True)
+
+    def prepare(self):
+        # everything before the creation of the CityObjects
+        self.timeStart = time.time()
         print('##########################')
         print('### STARTING IMPORT... ###')
         print('##########################')
         
-        # clean up unused objects
-        bpy.ops.outliner.orphans_purge(do_local_ids=True, do_linked_ids=False, do_recursive=True)
+        self.cleanUp()
+        self.takeSnapshot()
 
         self.load_data()
         self.getTransformationParameters()
@@ -154,10 +543,60 @@ class ImportProcess:
         # only set the world parameters if the file is the first CityJSON file to be imported
         if status is True:
             self.createWorldProperties()                         
-        self.createCityObjects()
+            self.firstImport = True
+        self.buildSpatialIndex()
+
+    def getImportSettings(self):
+        # settings which a reload of the file has to use as well
+        return {
+            "filter": None if self.spatialFilter is None else {"bbox": list(self.spatialFilter.bbox), "polygon": self.spatialFilter.polygon},
+            "lod": [self.lodSetting, self.lodValue],
+            "merge": [self.mergeSetting, self.tileSize],
+            "lazy": False,
+            # only objects imported with tracking know the file they come from, which a reload needs to find them
+            "tracking": self.trackingSetting,
+            # byte ranges of the sources, valid as long as the file keeps its size and modification time
+            "source": None if self.sourceRanges is None else {"stamp": getSourceStamp(self.filepath), "ranges": self.sourceRanges},
+        }
+
+    def saveImportSettings(self):
+        scene = bpy.context.scene
+        imports = json.loads(scene.get(self.settingsProperty, '{}'))
+        imports[self.changeTracker.normalizePath(self.filepath)] = self.getImportSettings()
+        scene[self.settingsProperty] = json.dumps(imports)
+
+    @classmethod
+    def loadImportSettings(cls, filepath):
+        # settings of the last import of the file, None if it has not been imported into the scene
+        imports = json.loads(bpy.context.scene.get(cls.settingsProperty, '{}'))
+        return imports.get(ChangeTracker().normalizePath(filepath))
+
+    @classmethod
+    def loadSourceSettings(cls):
+        # byte ranges of the sources of all files imported into the scene, keyed by their normalized path
+        imports = json.loads(bpy.context.scene.get(cls.settingsProperty, '{}'))
+        return {filepath: settings['source'] for filepath, settings in imports.items() if settings.get('source') is not None}
+
+    @classmethod
+    def loadSpatialFilter(cls, settings):
+        if settings.get('filter') is None:
+            return None
+        return SpatialFilter(settings['filter']['bbox'], settings['filter']['polygon'])
+
+    def finish(self):
+        self.collections.release()
+        self.saveAttributes()
+        self.saveImportSettings()
+        self.materialPalette.report()
 
         print('########################')
         print('### IMPORT FINISHED! ###')
         print('########################')
-        print("Time needed: %.4f sec" % (time.time() - time_start))
+        print("Time needed: %.4f sec" % (time.time() - self.timeStart))
+
+    def execute(self):
+        bpy.ops.wm.console_toggle()
+        self.prepare()
+        self.createCityObjects()
+        self.finish()
         return {'FINISHED'}
\ No newline at end of file
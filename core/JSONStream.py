@@ -0,0 +1,165 @@
+import json
+from .JSONWriter import openFile
+
+class JSONStream:
+
+    def __init__(self, filepath, chunkSize=1 << 22):
+        # File to be read
+        self.filepath = filepath
+        # number of bytes read from the file at once
+        self.chunkSize = chunkSize
+        # binary file handle
+        self.file = None
+        # part of the file that is currently held in memory
+        self.buffer = bytearray()
+        # position of the first byte of the buffer in the file
+        self.bufferStart = 0
+        # decoder used for all values of the file
+        self.decoder = json.JSONDecoder()
+        # byte range of every top-level member read by readDocument, keyed by its key
+        self.memberRanges = {}
+
+    def open(self):
+        self.file = openFile(self.filepath, 'rb')
+        self.buffer = bytearray()
+        self.bufferStart = 0
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.buffer = bytearray()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def fill(self, size):
+        # read the next bytes of the file into the buffer, returns False at the end of the file
+        self.file.seek(self.bufferStart + len(self.buffer))
+        chunk = self.file.read(size)
+        self.buffer += chunk
+        return len(chunk) > 0
+
+    def trim(self, pos):
+        # drop the part of the buffer in front of the given position once it gets too large
+        consumed = pos - self.bufferStart
+        if consumed > self.chunkSize:
+            del self.buffer[:consumed]
+            self.bufferStart = pos
+
+    def nextChar(self, pos):
+        # returns the position and the character of the next non-whitespace byte (b'' at the end of the file)
+        while True:
+            offset = pos - self.bufferStart
+            while offset < len(self.buffer) and self.buffer[offset] in b' \t\r\n':
+                offset += 1
+            if offset < len(self.buffer):
+                return self.bufferStart + offset, self.buffer[offset:offset + 1]
+            pos = self.bufferStart + offset
+            if not self.fill(self.chunkSize):
+                return pos, b''
+
+    def expect(self, pos, char):
+        pos, found = self.nextChar(pos)
+        if found != char:
+            raise ValueError("Invalid JSON in %s: expected %r at byte %d but found %r" % (self.filepath, char, pos, found))
+        return pos + 1
+
+    def decodeValue(self, pos):
+        # decode the JSON value at the given position, returns the value and the position behind it
+        pos, char = self.nextChar(pos)
+        offset = pos - self.bufferStart
+        # the value is decoded from a window that starts small and is doubled until it holds the whole value
+        size = 1 << 12
+        endOfFile = False
+        while True:
+            while len(self.buffer) - offset < size and not endOfFile:
+                endOfFile = not self.fill(max(self.chunkSize, size))
+            raw = bytes(self.buffer[offset:offset + size])
+            lastWindow = endOfFile and offset + size >= len(self.buffer)
+            try:
+                text = raw.decode('utf-8')
+            except UnicodeDecodeError as error:
+                # the window may end in the middle of a multi-byte character
+                if lastWindow or error.start < len(raw) - 3:
+                    raise
+                text = raw[:error.start].decode('utf-8')
+            try:
+                value, index = self.decoder.raw_decode(text)
+                # a number at the end of the window might continue behind it
+                if index < len(text) or lastWindow or isinstance(value, (dict, list, str)):
+                    break
+            except json.JSONDecodeError:
+                if lastWindow:
+                    raise
+            size *= 2
+        if raw.isascii():
+            return value, pos + index
+        return value, pos + len(text[:index].encode('utf-8'))
+
+    def iterMembers(self, pos):
+        # iterate through the members of the JSON object at the given position
+        # yields the key and the position of the value, the consumer has to send back the position behind the value
+        pos = self.expect(pos, b'{')
+        pos, char = self.nextChar(pos)
+        if char == b'}':
+            return pos + 1
+        while True:
+            key, pos = self.decodeValue(pos)
+            pos = self.expect(pos, b':')
+            pos = yield key, pos
+            self.trim(pos)
+            pos, char = self.nextChar(pos)
+            if char == b'}':
+                return pos + 1
+            if char != b',':
+                raise ValueError("Invalid JSON in %s: expected ',' or '}' at byte %d" % (self.filepath, pos))
+            pos += 1
+
+    def walkMembers(self, pos, onMember):
+        # call onMember(key, valuePosition) for every member of the object, which returns the position behind the value
+        members = self.iterMembers(pos)
+        try:
+            key, valuePos = next(members)
+            while True:
+                key, valuePos = members.send(onMember(key, valuePos))
+        except StopIteration as end:
+            return end.value
+
+    def readDocument(self, indexKey, onIndex=None):
+        # read all top-level members of the file except for the member "indexKey"
+        # for the members of "indexKey" only the byte range of every value is stored
+        # onIndex(key, value) is called for every indexed value before it is released
+        header = {}
+        index = []
+
+        def indexMember(key, pos):
+            start, char = self.nextChar(pos)
+            value, end = self.decodeValue(start)
+            index.append((key, start, end))
+            if onIndex is not None:
+                onIndex(key, value)
+            return end
+
+        def readMember(key, pos):
+            start, char = self.nextChar(pos)
+            if key == indexKey:
+                end = self.walkMembers(start, indexMember)
+            else:
+                header[key], end = self.decodeValue(start)
+            self.memberRanges[key] = (start, end)
+            return end
+
+        self.memberRanges = {}
+        self.walkMembers(0, readMember)
+        self.buffer = bytearray()
+        return header, index
+
+    def readValue(self, start, end):
+        # read and decode a single value by its byte range
+        self.file.seek(start)
+        return json.loads(self.file.read(end - start))
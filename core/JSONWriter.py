@@ -0,0 +1,102 @@
+import json
+import gzip
+import lzma
+import numpy
+
+# opener of every compression setting
+compressionOpeners = {'NONE': open, 'GZIP': gzip.open, 'XZ': lzma.open}
+
+def openFile(filepath, mode, compression=None):
+    # files ending in .gz or .xz are compressed and decompressed transparently
+    # compression ('NONE', 'GZIP' or 'XZ') overrides the extension of the file
+    lowerPath = filepath.lower()
+    if compression is not None:
+        opener = compressionOpeners[compression]
+    elif lowerPath.endswith('.gz'):
+        opener = gzip.open
+    elif lowerPath.endswith('.xz'):
+        opener = lzma.open
+    else:
+        opener = open
+    if 'b' in mode:
+        return opener(filepath, mode)
+    if opener is open:
+        return open(filepath, mode, encoding='utf-8')
+    return opener(filepath, mode + 't', encoding='utf-8')
+
+def stripCompression(filepath):
+    # path of the file without the extension of the compression
+    lowerPath = filepath.lower()
+    if lowerPath.endswith('.gz') or lowerPath.endswith('.xz'):
+        return filepath[:-3]
+    return filepath
+
+class JSONWriter:
+
+    def __init__(self, filepath, compact=False, chunkSize=10000, compression=None):
+        # File to be written
+        self.filepath = filepath
+        # 'NONE', 'GZIP' or 'XZ', None - chosen by the extension of the file
+        self.compression = compression
+        # True - no whitespace between the elements of the JSON
+        # False - default whitespace of the json module
+        self.separators = (',', ':') if compact else (', ', ': ')
+        # number of elements of large arrays (e.g. vertices) that are serialized at once
+        self.chunkSize = chunkSize
+        # text file handle
+        self.file = None
+
+    def open(self):
+        self.file = openFile(self.filepath, 'w', self.compression)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def dumps(self, value):
+        return json.dumps(value, separators=self.separators)
+
+    def writeValue(self, value, depth):
+        # the top-level members and their members (e.g. the CityObjects) are written one at a time
+        if isinstance(value, dict) and depth < 2:
+            self.writeObject(value, depth)
+        elif isinstance(value, numpy.ndarray) or (isinstance(value, list) and len(value) > self.chunkSize):
+            self.writeArray(value)
+        else:
+            self.file.write(self.dumps(value))
+
+    def writeObject(self, value, depth):
+        self.file.write('{')
+        for i, (key, member) in enumerate(value.items()):
+            if i > 0:
+                self.file.write(self.separators[0])
+            self.file.write(self.dumps(key) + self.separators[1])
+            self.writeValue(member, depth + 1)
+        self.file.write('}')
+
+    def writeArray(self, value):
+        # large arrays are serialized in chunks, so there is never a serialized copy of the whole array
+        self.file.write('[')
+        for start in range(0, len(value), self.chunkSize):
+            chunk = value[start:start + self.chunkSize]
+            if isinstance(chunk, numpy.ndarray):
+                chunk = chunk.tolist()
+            if start > 0:
+                self.file.write(self.separators[0])
+            self.file.write(self.dumps(chunk)[1:-1])
+        self.file.write(']')
+
+    def writeDocument(self, document):
+        self.writeValue(document, 0)
+
+    def writeLine(self, value):
+        # a single line of a JSON Lines file
+        self.file.write(self.dumps(value) + "\n")
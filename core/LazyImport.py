@@ -0,0 +1,264 @@
+import bpy
+import json
+import math
+import numpy
+from bpy.app.handlers import persistent
+from .ImportProcess import ImportProcess
+from .JSONStream import JSONStream
+from .JSONWriter import openFile
+from .Mesh import Mesh
+
+# import processes of the files with placeholders, keyed by the normalized file path (kept for the session)
+lazyProcesses = {}
+
+class LazyImportProcess(ImportProcess):
+
+    def __init__(self, filepath, textureSetting, trackingSetting=False, spatialFilter=None, lodSetting='ALL', lodValue=2.0):
+        # the CityObjects are only indexed by their position in the file
+        super().__init__(filepath, textureSetting, True, trackingSetting, spatialFilter, lodSetting, lodValue)
+        # type, LOD, extent and attributes of every CityObject, collected while the file is indexed
+        # the extent is given as ('crs', geographicalExtent), ('indices', vertex indices) or ('raw', unscaled bounds of a feature)
+        self.placeholderInfo = {}
+        # byte range of every line of a CityJSONSeq file and the IDs of the CityObjects of its feature
+        self.featureIndex = []
+        # unit cube shared by all placeholders
+        self.placeholderMesh = None
+        # uv coordinates of the appearance of the file (converted once)
+        self.textureVertices = None
+        # number of objects materialized (the placeholders are counted as imported objects)
+        self.materializedCount = 0
+
+    def load_data(self):
+        if self.sequenceFile:
+            self.indexSequence()
+        else:
+            self.stream = JSONStream(self.filepath)
+            with self.stream:
+                self.data, self.cityObjectIndex = self.stream.readDocument('CityObjects', self.storePlaceholderInfo)
+                self.storeSourceRanges(self.stream)
+            print('Indexed %d CityObjects for lazy import!' % len(self.cityObjectIndex))
+
+    def indexSequence(self):
+        # the byte range of every feature is stored, its CityObjects are only parsed to get their extents
+        with openFile(self.filepath, 'rb') as file:
+            line = file.readline()
+            self.data = json.loads(line)
+            start = len(line)
+            for line in iter(file.readline, b''):
+                end = start + len(line)
+                if line.strip():
+                    feature = json.loads(line)
+                    vertices = numpy.array(feature['vertices'], dtype=numpy.float64).reshape(-1, 3)
+                    for objID, object in feature['CityObjects'].items():
+                        self.storePlaceholderInfo(objID, object, vertices)
+                    self.featureIndex.append((start, end, list(feature['CityObjects'].keys())))
+                start = end
+        print('Indexed %d CityJSONFeatures for lazy import!' % len(self.featureIndex))
+
+    def storePlaceholderInfo(self, objID, object, featureVertices=None):
+        if self.spatialFilter is not None and featureVertices is None:
+            self.storeObjectExtent(objID, object)
+        if not self.selectGeometry(object):
+            return
+        geometries = object.get('geometry', [])
+        lod = math.floor(float(geometries[0]['lod'])) if geometries and 'lod' in geometries[0] else None
+        if 'geographicalExtent' in object:
+            extent = ('crs', object['geographicalExtent'])
+        else:
+            indices = numpy.unique(numpy.fromiter((index for geom in geometries for index in self.changeTracker.iterIndices(geom['boundaries'])), dtype=numpy.int64))
+            if len(indices) == 0:
+                return
+            if featureVertices is None:
+                extent = ('indices', indices)
+            else:
+                used = featureVertices[indices]
+                extent = ('raw', numpy.concatenate((used.min(axis=0), used.max(axis=0))))
+        self.placeholderInfo[objID] = (object['type'], lod, extent, object.get('attributes'))
+
+    def sceneExtent(self, extent):
+        # minimum and maximum corner of the extent in the coordinates of the scene
+        kind, values = extent
+        if kind == 'crs':
+            sceneOrigin = numpy.array(self.worldOrigin, dtype=numpy.float64) - self.originDelta
+            return numpy.array(values[:3], dtype=numpy.float64) - sceneOrigin, numpy.array(values[3:], dtype=numpy.float64) - sceneOrigin
+        if kind == 'indices':
+            points = self.vertices[values]
+            return points.min(axis=0), points.max(axis=0)
+        scale = numpy.array(self.scaleParam, dtype=numpy.float64)
+        return (values[:3] - self.vertexOffset) * scale + self.originDelta, (values[3:] - self.vertexOffset) * scale + self.originDelta
+
+    def acceptPlaceholder(self, objID, minCorner, maxCorner):
+        # True if the CityObject is part of the import
+        if self.spatialFilter is None:
+            return True
+        if objID in self.indexedIDs:
+            return objID in self.selectedIDs
+        sceneOrigin = numpy.array(self.worldOrigin, dtype=numpy.float64) - self.originDelta
+        return self.spatialFilter.intersects((minCorner[0] + sceneOrigin[0], minCorner[1] + sceneOrigin[1], maxCorner[0] + sceneOrigin[0], maxCorner[1] + sceneOrigin[1]))
+
+    def getPlaceholderMesh(self):
+        # unit cube, which is scaled to the extent of every placeholder
+        mesh = bpy.data.meshes.get('CityJSON_Placeholder')
+        if mesh is None:
+            vertices = numpy.array([[x, y, z] for z in (0, 1) for y in (0, 1) for x in (0, 1)], dtype=numpy.float64)
+            loops = numpy.array([0, 2, 3, 1, 4, 5, 7, 6, 0, 1, 5, 4, 2, 6, 7, 3, 0, 4, 6, 2, 1, 3, 7, 5], dtype=numpy.int32)
+            loopTotals = numpy.full(6, 4, dtype=numpy.int32)
+            mesh = Mesh(None, None, 'CityJSON_Placeholder').fillBlenderMesh('CityJSON_Placeholder', vertices, loops, numpy.arange(0, 24, 4, dtype=numpy.int32), loopTotals)
+        return mesh
+
+    def iterPlaceholders(self):
+        # yields the ID and the byte range of every CityObject
+        if self.sequenceFile:
+            for start, end, objIDs in self.featureIndex:
+                for objID in objIDs:
+                    self.scannedCount += 1
+                    yield objID, start, end
+        else:
+            for objID, start, end in self.cityObjectIndex:
+                self.scannedCount += 1
+                yield objID, start, end
+
+    def createPlaceholder(self, objID, start, end):
+        info = self.placeholderInfo.get(objID)
+        if info is None:
+            return
+        objectType, lod, extent, attributes = info
+        minCorner, maxCorner = self.sceneExtent(extent)
+        if not self.acceptPlaceholder(objID, minCorner, maxCorner):
+            return
+        self.storeAttributes(objID, attributes)
+        newObj = bpy.data.objects.new(objID, self.placeholderMesh)
+        newObj.location = minCorner.tolist()
+        newObj.scale = numpy.maximum(maxCorner - minCorner, 1e-3).tolist()
+        newObj['cityJSONType'] = objectType
+        if lod is not None:
+            newObj['LOD'] = lod
+        newObj['cityJSONID'] = objID
+        newObj['cityJSONFile'] = self.changeTracker.normalizePath(self.filepath)
+        # everything needed to build the object later on
+        newObj['cityJSONPlaceholder'] = json.dumps({
+            "range": [start, end],
+            "textures": self.textureSetting,
+            "tracking": self.trackingSetting,
+            "lod": [self.lodSetting, self.lodValue],
+        })
+        self.collections.link(newObj)
+        self.importedCount += 1
+
+    def iterCreateCityObjects(self):
+        self.placeholderMesh = self.getPlaceholderMesh()
+        for objID, start, end in self.iterPlaceholders():
+            self.createPlaceholder(objID, start, end)
+            yield
+        # the information needed to materialize the placeholders is kept for the session
+        self.placeholderInfo = {}
+        lazyProcesses[self.changeTracker.normalizePath(self.filepath)] = self
+        print('%d placeholders have been created!' % (self.importedCount))
+
+    def getCreatedDatablocks(self):
+        created = super().getCreatedDatablocks()
+        created['meshes'].append(self.placeholderMesh)
+        return created
+
+    def getImportSettings(self):
+        settings = super().getImportSettings()
+        settings['lazy'] = True
+        return settings
+
+    def materializeObject(self, file, placeholder):
+        # read the CityObject by its byte range and replace the placeholder by its full mesh
+        settings = json.loads(placeholder['cityJSONPlaceholder'])
+        start, end = settings['range']
+        file.seek(start)
+        value = json.loads(file.read(end - start))
+        objID = placeholder['cityJSONID']
+        self.featureRanges[objID] = (start, end)
+        if self.sequenceFile:
+            data = value
+            object = value['CityObjects'][objID]
+            vertices = self.scaleFeatureVertices(value['vertices'])
+            textureVertices = self.loadTextureVertices(data)
+            sourceVertices = self.realWorldVertices(self.loadVertexArray(data['vertices'])) if self.trackingSetting else None
+        else:
+            data = self.data
+            object = value
+            vertices = self.vertices
+            if self.textureVertices is None:
+                self.textureVertices = self.loadTextureVertices(data)
+            textureVertices = self.textureVertices
+            sourceVertices = self.sourceVertices
+        self.selectGeometry(object)
+        newObject = self.createCityObject(objID, object, vertices, data, textureVertices, sourceVertices)
+        # the placeholder takes over the mesh, the placement and the properties of the new object
+        placeholder.data = newObject.data
+        placeholder.matrix_world = newObject.matrix_world.copy()
+        del placeholder['cityJSONPlaceholder']
+        for key in newObject.keys():
+            placeholder[key] = newObject[key]
+        bpy.data.objects.remove(newObject, do_unlink=True)
+        self.materializedCount += 1
+
+    def countCityObjects(self):
+        if self.sequenceFile:
+            return sum(len(objIDs) for start, end, objIDs in self.featureIndex)
+        return len(self.cityObjectIndex)
+
+    def materializeObjects(self, placeholders):
+        # the objects are read in the order of the file, so compressed files are never decompressed from the start again
+        placeholders = sorted(placeholders, key=lambda placeholder: json.loads(placeholder['cityJSONPlaceholder'])['range'][0])
+        with openFile(self.filepath, 'rb') as file:
+            for placeholder in placeholders:
+                self.materializeObject(file, placeholder)
+        print('%d placeholders have been materialized!' % (len(placeholders)))
+
+def getLazyProcess(filepath, settings):
+    # the import process of the file, which is prepared again if the blend file has been reopened
+    process = lazyProcesses.get(filepath)
+    if process is None:
+        lodSetting, lodValue = settings['lod']
+        process = LazyImportProcess(filepath, settings['textures'], settings['tracking'], None, lodSetting, lodValue)
+        process.load_data()
+        process.getTransformationParameters()
+        process.scaleVertexCoordinates()
+        process.checkImport()
+        process.placeholderInfo = {}
+        lazyProcesses[filepath] = process
+    return process
+
+def materializePlaceholders(objects):
+    # build the full meshes of the given placeholders, grouped by their file
+    byFile = {}
+    for object in objects:
+        if object.get('cityJSONPlaceholder'):
+            byFile.setdefault(object['cityJSONFile'], []).append(object)
+    for filepath, placeholders in byFile.items():
+        process = getLazyProcess(filepath, json.loads(placeholders[0]['cityJSONPlaceholder']))
+        process.materializeObjects(placeholders)
+
+def materializeSelected():
+    # placeholders that are selected or edited are replaced by their full meshes
+    context = bpy.context
+    placeholders = [object for object in context.selected_objects if object.get('cityJSONPlaceholder')]
+    active = context.view_layer.objects.active
+    if active is not None and active.get('cityJSONPlaceholder') and active not in placeholders:
+        placeholders.append(active)
+    if not placeholders:
+        return None
+    editing = active is not None and active.mode == 'EDIT' and active in placeholders
+    if editing:
+        bpy.ops.object.mode_set(mode='OBJECT')
+    materializePlaceholders(placeholders)
+    if editing:
+        bpy.ops.object.mode_set(mode='EDIT')
+    # the timer is not repeated
+    return None
+
+@persistent
+def placeholderHandler(scene, depsgraph):
+    # the data of the scene must not be changed while the depsgraph is updated, so the placeholders are materialized by a timer
+    context = bpy.context
+    active = getattr(context, 'active_object', None)
+    selected = getattr(context, 'selected_objects', [])
+    if (active is not None and active.get('cityJSONPlaceholder')) or any(object.get('cityJSONPlaceholder') for object in selected):
+        if not bpy.app.timers.is_registered(materializeSelected):
+            bpy.app.timers.register(materializeSelected, first_interval=0.0)
@@ -0,0 +1,61 @@
+import bpy
+import json
+from .FeatureTypes import FeatureTypes
+from .Material import Material
+from .ImageCache import ImageCache
+
+class MaterialPalette:
+
+    # custom property of the materials created by a palette, which identifies the kind of surface they stand for
+    keyProperty = 'cityJSONPaletteKey'
+
+    def __init__(self, textureSetting, filepath, reuseMaterials=False):
+        # Import-setting which lets the user choose if textures present in the CityJSON should be imported
+        self.textureSetting = textureSetting
+        # True - materials created by an earlier palette for the same kind of surface are reused (reload and editing)
+        # False - new materials are created
+        self.reuseMaterials = reuseMaterials
+        # File to be imported
+        self.filepath = filepath
+        # materials created during the import, keyed by (object type, surface type, texture image)
+        self.materials = {}
+        # color presets, shared by all materials of the palette
+        self.featureTypes = FeatureTypes()
+        # images of the textures, every image file is only loaded once
+        self.imageCache = ImageCache(filepath)
+
+    def getMaterial(self, objectType, surfaceType, textureIndex, rawObjectData):
+        # the texture is identified by its image, since texture indices are only valid within one appearance section
+        image = None
+        if self.textureSetting and textureIndex is not None:
+            image = rawObjectData['appearance']['textures'][textureIndex]['image']
+        key = (objectType, surfaceType, image)
+        material = self.materials.get(key)
+        if material is None:
+            material = self.createMaterial(objectType, surfaceType, textureIndex, image, rawObjectData)
+            self.materials[key] = material
+        return material
+
+    def createMaterial(self, objectType, surfaceType, textureIndex, image, rawObjectData):
+        # create a single material, which is shared by all surfaces of the same kind
+        name = str(objectType)+"_"+str(surfaceType)
+        if image is not None:
+            name = name+"_"+str(image).replace("\\", "/").rsplit("/", 1)[-1]
+        paletteKey = json.dumps([objectType, surfaceType, image])
+        if self.reuseMaterials:
+            existing = bpy.data.materials.get(name)
+            if existing is not None and existing.get(self.keyProperty) == paletteKey:
+                return existing
+        material = Material(type=surfaceType, newObject=None, objectID=None, textureSetting=self.textureSetting, objectType=objectType, surfaceIndex=None, surfaceValue=None, rawObjectData=rawObjectData, filepath=self.filepath, geometry=None)
+        material.createDatablock(name)
+        if image is not None:
+            material.setTexture(textureIndex, self.imageCache)
+        else:
+            material.setColor(self.featureTypes)
+        material.material[self.keyProperty] = paletteKey
+        return material.material
+
+    def report(self):
+        print("Material palette: %d materials" % (len(self.materials)))
+        if self.textureSetting:
+            self.imageCache.report()
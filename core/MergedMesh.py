@@ -0,0 +1,187 @@
+import bpy
+import json
+import math
+import numpy
+from .Mesh import Mesh
+from .SurfaceAttribute import SurfaceAttribute
+
+class MergedMesh:
+
+    def __init__(self, name, materialPalette):
+        # name of the blender object holding the merged CityObjects
+        self.name = name
+        # materials shared by all objects of the import
+        self.materialPalette = materialPalette
+        # lookup tables of the face attributes: ID of every CityObject, object types and surface types
+        self.objectIDs = []
+        self.objectTypes = []
+        self.surfaceTypes = []
+        self.typeIndices = {}
+        self.surfaceIndices = {}
+        # mesh arrays of all CityObjects, which are concatenated once the mesh is created
+        self.vertexArrays = []
+        self.loopArrays = []
+        self.loopTotalArrays = []
+        self.vertexCount = 0
+        # face attributes of all CityObjects
+        self.faceObjects = []
+        self.faceTypes = []
+        self.faceLODs = []
+        self.faceSurfaces = []
+        self.faceSlots = []
+        # material slot of every material of the palette used by the merged object
+        self.materialSlots = {}
+        self.materials = []
+        # the blender object created for the merged CityObjects
+        self.newObject = None
+
+    def tableIndex(self, table, indices, value):
+        # index of the value in the lookup table, new values are appended
+        index = indices.get(value)
+        if index is None:
+            index = len(table)
+            table.append(value)
+            indices[value] = index
+        return index
+
+    def polygonSurfaces(self, object):
+        # surface type of every polygon in the order of Mesh.extractVertexMapping, None if the polygon has no semantics
+        surfaces = []
+        for geom in object['geometry']:
+            if geom['type'] != 'Solid':
+                continue
+            semantics = geom.get('semantics')
+            for shellIndex, shell in enumerate(geom['boundaries']):
+                for faceIndex, face in enumerate(shell):
+                    surfaceType = None
+                    if semantics is not None and object['type'] != 'GenericCityObject':
+                        value = semantics['values'][shellIndex][faceIndex]
+                        if value is not None:
+                            surfaceType = semantics['surfaces'][value]['type']
+                    surfaces.extend(surfaceType for side in face if side)
+        return surfaces
+
+    def getSlot(self, objectType, surfaceType, rawObjectData):
+        # material slot of the palette material for the surfaces of this kind
+        if surfaceType is None:
+            return 0
+        material = self.materialPalette.getMaterial(objectType, surfaceType, None, rawObjectData)
+        slot = self.materialSlots.get(material.name)
+        if slot is None:
+            slot = len(self.materials)
+            self.materials.append(material)
+            self.materialSlots[material.name] = slot
+        return slot
+
+    def addCityObject(self, objID, object, vertices, rawObjectData, meshArrays=None):
+        # the arrays of the mesh may have been prepared in advance (see ImportPipeline)
+        if meshArrays is None:
+            mesh = Mesh(object, vertices, objID)
+            mesh.extractVertexMapping()
+            meshArrays = mesh.prepareMeshArrays()
+        meshVertices, loopVertexIndices, loopStarts, loopTotals = meshArrays
+        if len(loopTotals) == 0:
+            print('The object ' + objID + ' has no faces and is skipped!')
+            return
+        objectIndex = len(self.objectIDs)
+        self.objectIDs.append(objID)
+        typeIndex = self.tableIndex(self.objectTypes, self.typeIndices, object['type'])
+        lod = math.floor(float(object['geometry'][0]['lod']))
+        # the vertices of every object are kept separate, so the objects can be split again on export
+        self.vertexArrays.append(meshVertices)
+        self.loopArrays.append(loopVertexIndices + self.vertexCount)
+        self.loopTotalArrays.append(loopTotals)
+        self.vertexCount += len(meshVertices)
+        faceCount = len(loopTotals)
+        surfaces = self.polygonSurfaces(object)[:faceCount]
+        surfaces += [None] * (faceCount - len(surfaces))
+        self.faceObjects.append(numpy.full(faceCount, objectIndex, dtype=numpy.int32))
+        self.faceTypes.append(numpy.full(faceCount, typeIndex, dtype=numpy.int32))
+        self.faceLODs.append(numpy.full(faceCount, lod, dtype=numpy.int32))
+        self.faceSurfaces.append(numpy.array([-1 if surfaceType is None else self.tableIndex(self.surfaceTypes, self.surfaceIndices, surfaceType) for surfaceType in surfaces], dtype=numpy.int32))
+        self.faceSlots.append(numpy.array([self.getSlot(object['type'], surfaceType, rawObjectData) for surfaceType in surfaces], dtype=numpy.int32))
+
+    def setFaceAttribute(self, mesh, name, values):
+        attribute = mesh.attributes.new(name=name, type='INT', domain='FACE')
+        attribute.data.foreach_set('value', values)
+
+    def createObject(self):
+        loopTotals = numpy.concatenate(self.loopTotalArrays)
+        loopStarts = numpy.zeros_like(loopTotals)
+        numpy.cumsum(loopTotals[:-1], out=loopStarts[1:])
+        mesh = Mesh(None, None, self.name).fillBlenderMesh(self.name, numpy.concatenate(self.vertexArrays), numpy.concatenate(self.loopArrays), loopStarts, loopTotals)
+        # the CityObject, type, LOD and surface type of every face
+        self.setFaceAttribute(mesh, 'cityJSONObject', numpy.concatenate(self.faceObjects))
+        self.setFaceAttribute(mesh, 'cityJSONTypeIndex', numpy.concatenate(self.faceTypes))
+        self.setFaceAttribute(mesh, 'cityJSONLOD', numpy.concatenate(self.faceLODs))
+        self.setFaceAttribute(mesh, SurfaceAttribute.attributeName, numpy.concatenate(self.faceSurfaces))
+        mesh[SurfaceAttribute.tableName] = json.dumps(self.surfaceTypes)
+        for material in self.materials:
+            mesh.materials.append(material)
+        mesh.polygons.foreach_set('material_index', numpy.concatenate(self.faceSlots))
+        newObj = bpy.data.objects.new(self.name, mesh)
+        newObj['cityJSONType'] = 'Merged'
+        newObj['LOD'] = int(max(lods.max() for lods in self.faceLODs))
+        newObj['cityJSONMerged'] = True
+        # lookup tables of the face attributes
+        newObj['cityJSONObjects'] = json.dumps(self.objectIDs)
+        newObj['cityJSONTypes'] = json.dumps(self.objectTypes)
+        self.newObject = newObj
+        print('Merged %d CityObjects into %s!' % (len(self.objectIDs), self.name))
+        return newObj
+
+class MergedMeshReader:
+
+    def __init__(self, object):
+        # blender object holding merged CityObjects
+        self.object = object
+
+    def getFaceAttribute(self, mesh, name):
+        values = numpy.zeros(len(mesh.polygons), dtype=numpy.int32)
+        attribute = mesh.attributes.get(name)
+        if attribute is not None:
+            attribute.data.foreach_get('value', values)
+        return values
+
+    def iterParts(self):
+        # yields the vertices, faces, type, LOD and semantics of every CityObject of the merged mesh
+        mesh = self.object.data
+        objectIDs = json.loads(self.object['cityJSONObjects'])
+        objectTypes = json.loads(self.object['cityJSONTypes'])
+        surfaceTypes = json.loads(mesh[SurfaceAttribute.tableName])
+        vertices = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+        mesh.vertices.foreach_get('co', vertices)
+        vertices = vertices.reshape(-1, 3).astype(numpy.float64)
+        loopVertexIndices = numpy.empty(len(mesh.loops), dtype=numpy.int32)
+        mesh.loops.foreach_get('vertex_index', loopVertexIndices)
+        loopStarts = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+        mesh.polygons.foreach_get('loop_start', loopStarts)
+        loopTotals = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+        mesh.polygons.foreach_get('loop_total', loopTotals)
+        faceObjects = self.getFaceAttribute(mesh, 'cityJSONObject')
+        faceTypes = self.getFaceAttribute(mesh, 'cityJSONTypeIndex')
+        faceLODs = self.getFaceAttribute(mesh, 'cityJSONLOD')
+        faceSurfaces = self.getFaceAttribute(mesh, SurfaceAttribute.attributeName)
+        # the faces of every object in their original order
+        order = numpy.argsort(faceObjects, kind='stable')
+        groups, groupStarts = numpy.unique(faceObjects[order], return_index=True)
+        for objectIndex, faces in zip(groups.tolist(), numpy.split(order, groupStarts[1:])):
+            if objectIndex < 0 or objectIndex >= len(objectIDs):
+                continue
+            totals = loopTotals[faces]
+            starts = numpy.zeros_like(totals)
+            numpy.cumsum(totals[:-1], out=starts[1:])
+            # mesh loops of all faces of the object
+            loops = numpy.repeat(loopStarts[faces] - starts, totals) + numpy.arange(int(totals.sum()))
+            usedVertices, localIndices = numpy.unique(loopVertexIndices[loops], return_inverse=True)
+            yield {
+                "id": objectIDs[objectIndex],
+                "type": objectTypes[faceTypes[faces[0]]],
+                "lod": int(faceLODs[faces[0]]),
+                "vertices": vertices[usedVertices],
+                "loopVertexIndices": localIndices.reshape(-1).astype(numpy.int64),
+                "loopStarts": starts,
+                "loopTotals": totals,
+                "surfaceIndices": faceSurfaces[faces],
+                "surfaceTypes": surfaceTypes,
+            }
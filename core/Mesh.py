@@ -1,11 +1,13 @@
 import bpy
+import numpy
+import itertools
 
 class Mesh:
 
     def __init__(self, object, vertices, oid):
         # entire data of the object
         self.object = object
-        # list of all vertices
+        # array of all vertices
         self.vertices = vertices
         # list which describes the faces mapped to the vertex indices
         self.vertexMaps = []
@@ -23,44 +25,42 @@ class Mesh:
                             if side:
                                 self.vertexMaps.append(side)
     
-    def createBlenderMesh(self):
-        # vertices used for defining blender meshes
-        vertices = []
-        # edges defined by vertex indices (not required if faces are made)
-        edges = []
-        # faces defindes by vertex indides
-        faces = []
-        # only the vertices that are actually part of the mesh
-        meshVertices = []
-        # new face mapping values
-        newFaces = []
-        
-        # vertices from cityJSON file
-        vertices = self.vertices
-        # facemapping from cityJSON file
-        faces = self.vertexMaps
-        
+    def prepareMeshArrays(self):
+        # number of vertices (loops) of every face
+        loopTotals = numpy.fromiter((len(face) for face in self.vertexMaps), dtype=numpy.int32, count=len(self.vertexMaps))
+        # all source vertex indices of all faces in one flat array
+        sourceLoops = numpy.fromiter(itertools.chain.from_iterable(self.vertexMaps), dtype=numpy.int64, count=int(loopTotals.sum()))
+        if sourceLoops.size == 0:
+            return numpy.zeros((0, 3)), sourceLoops.astype(numpy.int32), loopTotals, loopTotals
         # only use vertices, that are part of the mesh
-        for face in faces:
-            # create new face array
-            newFace = []
-            # check vertex coordinate in face
-            for value in face:
-                vertexCoords = vertices[value]
-                # if the coordinate used in the mesh already exists get its index
-                if vertexCoords in meshVertices:
-                    newFace.append(meshVertices.index(vertexCoords))
-                # if the coordinate does not jet exist add it to the mesh and get its index
-                else:
-                    meshVertices.append(vertexCoords)
-                    newFace.append(meshVertices.index(vertexCoords))
-            # add the newly mapped face to the list of faces for the mesh
-            newFaces.append(newFace)
+        # sourceIndices --> the source vertex index of every mesh vertex
+        # loopVertexIndices --> the mesh vertex index of every loop
+        sourceIndices, loopVertexIndices = numpy.unique(sourceLoops, return_inverse=True)
+        # vertices with identical coordinates become a single mesh vertex
+        meshVertices, weldIndices = numpy.unique(self.vertices[sourceIndices], axis=0, return_inverse=True)
+        loopVertexIndices = weldIndices.reshape(-1)[loopVertexIndices.reshape(-1)].astype(numpy.int32)
+        # index of the first loop of every face
+        loopStarts = numpy.zeros_like(loopTotals)
+        numpy.cumsum(loopTotals[:-1], out=loopStarts[1:])
+        return meshVertices, loopVertexIndices, loopStarts, loopTotals
+
+    def createBlenderMesh(self):
+        return self.fillBlenderMesh(self.name, *self.prepareMeshArrays())
 
+    def fillBlenderMesh(self, name, meshVertices, loopVertexIndices, loopStarts, loopTotals):
         # creating a new mesh with the name of the object
-        newMesh = bpy.data.meshes.new(self.name)
-        # build the mesh from vertices and faces (edges not required)
-        newMesh.from_pydata(meshVertices, edges, newFaces)
+        newMesh = bpy.data.meshes.new(name)
+        # fill the mesh with flat arrays of vertices, loops and faces (edges are calculated afterwards)
+        newMesh.vertices.add(len(meshVertices))
+        newMesh.vertices.foreach_set('co', meshVertices.astype(numpy.float32).ravel())
+        newMesh.loops.add(len(loopVertexIndices))
+        newMesh.loops.foreach_set('vertex_index', loopVertexIndices)
+        newMesh.polygons.add(len(loopTotals))
+        newMesh.polygons.foreach_set('loop_start', loopStarts)
+        # since Blender 4.0 the loop total is derived from the loop starts
+        if bpy.app.version < (4, 0, 0):
+            newMesh.polygons.foreach_set('loop_total', loopTotals)
+        newMesh.update(calc_edges=True)
         # return the mesh so it can be handed over to the object  
         return newMesh    
         
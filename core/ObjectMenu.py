@@ -1,7 +1,10 @@
 import bpy
+import json
 from .FeatureTypes import FeatureTypes
-from .Material import Material
-import math
+from .MaterialPalette import MaterialPalette
+from .SurfaceAttribute import SurfaceAttribute
+from .CityObjectIndex import updateIndex
+import numpy
 
 class SetAttributes(bpy.types.Operator):
     bl_idname = "wm.set_attributes"
@@ -11,6 +14,7 @@ class SetAttributes(bpy.types.Operator):
         obj = bpy.context.active_object
         obj['cityJSONType'] = "Building"
         obj['LOD'] = 2 
+        updateIndex(obj)
         return {'FINISHED'} 
 
 class SetConstructionOperator(bpy.types.Operator):
@@ -21,6 +25,7 @@ class SetConstructionOperator(bpy.types.Operator):
     def execute(self, context):
         obj = bpy.context.active_object
         obj['cityJSONType'] = self.cityJSONType
+        updateIndex(obj)
         return {'FINISHED'} 
     
 
@@ -42,54 +47,51 @@ class CalculateSemanticsOperator(bpy.types.Operator):
     bl_idname = "wm.calc_semantics"
     bl_label = "CalculateSemantics"
 
+    # surface types derived from the face normals
+    surfaceTypes = ["GroundSurface", "WallSurface", "RoofSurface"]
+
     def execute(self, context):
 
+        obj = context.object
         # if initial attributes are not already set, do so now
-        try: 
-            obj = bpy.context.active_object
-            type = obj['cityJSONType']
-                        
-        except:
+        if 'cityJSONType' not in obj:
             obj['cityJSONType'] = "Building"
             obj['LOD'] = 2 
-        
-        def materialCreator(surfaceType,matSlot,faceIndex):
-            mat = Material(type=surfaceType, newObject=obj, objectID=obj.id_data.name, textureSetting=False, objectType=obj['cityJSONType'], surfaceIndex=None, surfaceValue=None, filepath=None, rawObjectData=None, geometry=None)
-            mat.createMaterial()
-            mat.setColor()
-            mat.addMaterialToFace(matSlot,faceIndex)
-            del mat
+            updateIndex(obj)
 
-        def materialCleaner():
+        # the mesh data is only up to date in object mode, the mode of the user is restored afterwards
+        mode = obj.mode
+        if mode != 'OBJECT':
             bpy.ops.object.mode_set(mode='OBJECT')
-            for face in obj.data.polygons:
-                matIndex = face.material_index
-                bpy.context.object.active_material_index = matIndex
-                bpy.ops.object.material_slot_remove()
-            bpy.ops.object.mode_set(mode='EDIT')   
-            bpy.ops.outliner.orphans_purge(do_local_ids=True, do_linked_ids=False, do_recursive=True)
-
-        obj = context.object
-
-        materialCleaner()
-        matSlot = 0
-        for faceIndex, face in enumerate(obj.data.polygons):
-            if math.isclose(face.normal[2] ,-1.0):
-                surfaceType = "GroundSurface"
-                materialCreator(surfaceType,matSlot,faceIndex)
-                matSlot+=1
-            elif math.isclose(face.normal[2],0,abs_tol=1e-3) or ((face.normal[2] < 0) and (math.isclose(face.normal[2],-1.0) == False)):
-                surfaceType = "WallSurface"
-                materialCreator(surfaceType,matSlot,faceIndex)
-                matSlot+=1
-            else:
-                surfaceType = "RoofSurface"
-                materialCreator(surfaceType,matSlot,faceIndex)
-                matSlot+=1
+        mesh = obj.data
+
+        # z component of the normal of every face
+        normals = numpy.empty(len(mesh.polygons) * 3, dtype=numpy.float32)
+        mesh.polygons.foreach_get('normal', normals)
+        normalZ = normals.reshape(-1, 3)[:, 2]
+        isGround = numpy.isclose(normalZ, -1.0, rtol=1e-6, atol=0.0)
+        isWall = ~isGround & (numpy.isclose(normalZ, 0.0, rtol=0.0, atol=1e-3) | (normalZ < 0))
+        # 0 - GroundSurface, 1 - WallSurface, 2 - RoofSurface
+        faceTypes = numpy.where(isGround, 0, numpy.where(isWall, 1, 2))
+
+        # the semantics are written to the face attribute, the shared materials of the surface types are only used for display
+        surfaceAttribute = SurfaceAttribute(obj)
+        palette = MaterialPalette(False, "", True)
+        # only the untextured palette materials are replaced, textured and other materials keep their slots
+        for slot in reversed(range(len(mesh.materials))):
+            material = mesh.materials[slot]
+            if material is not None and MaterialPalette.keyProperty in material and json.loads(material[MaterialPalette.keyProperty])[2] is None:
+                mesh.materials.pop(index=slot)
+        tableIndices = numpy.zeros(len(self.surfaceTypes), dtype=numpy.int32)
+        slots = numpy.zeros(len(self.surfaceTypes), dtype=numpy.int32)
+        for typeIndex, surfaceType in enumerate(self.surfaceTypes):
+            tableIndices[typeIndex] = surfaceAttribute.getIndex(surfaceType)
+            material = palette.getMaterial(obj['cityJSONType'], surfaceType, None, None)
+            slots[typeIndex] = surfaceAttribute.getMaterialSlot(material)
+        surfaceAttribute.write(tableIndices[faceTypes])
+        mesh.polygons.foreach_set('material_index', slots[faceTypes])
+        mesh.update()
+        if mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode=mode)
         
         return {'FINISHED'}
-
-            
-           
-
-
@@ -0,0 +1,124 @@
+import bpy
+import json
+from .CityObjectIndex import getIndex
+
+class CityJSONQuerySettings(bpy.types.PropertyGroup):
+    # criteria of the query, empty fields match every object
+    object_type: bpy.props.StringProperty(name="Type", description="cityJSONType of the objects (empty for all types)", default="")
+    lod: bpy.props.IntProperty(name="LOD", description="LOD of the objects (-1 for all LODs)", default=-1, min=-1, max=4)
+    attribute_key: bpy.props.StringProperty(name="Attribute", description="Key of the attribute the objects must have (empty for all objects)", default="")
+    attribute_value: bpy.props.StringProperty(name="Value", description="Value of the attribute, numbers and booleans are given as in JSON (empty for any value)", default="")
+    # changes applied to all matching objects, empty fields are left as they are
+    edit_type: bpy.props.StringProperty(name="Set Type", description="New cityJSONType of the matching objects (empty to keep it)", default="")
+    edit_lod: bpy.props.IntProperty(name="Set LOD", description="New LOD of the matching objects (-1 to keep it)", default=-1, min=-1, max=4)
+    edit_key: bpy.props.StringProperty(name="Set Attribute", description="Key of the attribute to set on the matching objects (empty to keep the attributes)", default="")
+    edit_value: bpy.props.StringProperty(name="To Value", description="New value of the attribute as JSON (e.g. 12.5, true or \"1000\"), other text is stored as string", default="")
+
+def queryObjects(context):
+    # names of the objects matching the query of the scene
+    settings = context.scene.cityJSONQuery
+    index = getIndex(context.scene)
+    return index, index.query(settings.object_type, settings.lod, settings.attribute_key, settings.attribute_value)
+
+def parseValue(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+class QueryCityObjectsOperator(bpy.types.Operator):
+    bl_idname = "wm.query_cityobjects"
+    bl_label = "Query CityObjects"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    action: bpy.props.EnumProperty(
+        name="Action",
+        items=(
+            ('SELECT', "Select", "Select the matching objects"),
+            ('HIDE', "Hide", "Hide the matching objects"),
+            ('ISOLATE', "Isolate", "Show only the matching objects"),
+            ('SHOW', "Show All", "Show all objects again"),
+        ),
+        default='SELECT',
+    )
+
+    def execute(self, context):
+        viewLayerObjects = context.view_layer.objects
+        if self.action == 'SHOW':
+            for object in viewLayerObjects:
+                object.hide_set(False)
+            return {'FINISHED'}
+        index, names = queryObjects(context)
+        if self.action == 'SELECT':
+            for object in context.selected_objects:
+                object.select_set(False)
+            for name in names:
+                object = viewLayerObjects.get(name)
+                if object is not None and object.visible_get():
+                    object.select_set(True)
+        elif self.action == 'HIDE':
+            for name in names:
+                object = viewLayerObjects.get(name)
+                if object is not None:
+                    object.hide_set(True)
+        else:
+            for object in viewLayerObjects:
+                object.hide_set(object.name not in names)
+        self.report({'INFO'}, "%d objects match the query" % (len(names)))
+        return {'FINISHED'}
+
+class EditCityObjectsOperator(bpy.types.Operator):
+    bl_idname = "wm.edit_cityobjects"
+    bl_label = "Edit CityObjects"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        settings = context.scene.cityJSONQuery
+        index, names = queryObjects(context)
+        objects = [bpy.data.objects[name] for name in names if name in bpy.data.objects]
+        # the type and LOD of merged objects are those of their parts, which are kept in the faces of the mesh
+        merged = [object for object in objects if object.get('cityJSONMerged')]
+        for object in objects:
+            if object.get('cityJSONMerged'):
+                continue
+            if settings.edit_type:
+                object['cityJSONType'] = settings.edit_type
+            if settings.edit_lod >= 0:
+                object['LOD'] = settings.edit_lod
+            index.updateObject(object)
+        if settings.edit_key and objects:
+            index.setAttribute(objects, settings.edit_key, parseValue(settings.edit_value))
+            index.save(context.scene)
+        if merged and (settings.edit_type or settings.edit_lod >= 0):
+            self.report({'WARNING'}, "%d objects have been changed, the type and LOD of %d merged objects cannot be changed" % (len(objects), len(merged)))
+        else:
+            self.report({'INFO'}, "%d objects have been changed" % (len(objects)))
+        return {'FINISHED'}
+
+class VIEW3D_PT_cityjson_query(bpy.types.Panel):
+    bl_label = "CityJSON Query"
+    bl_idname = "VIEW3D_PT_cityjson_query"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "CityJSON"
+
+    def draw(self, context):
+        layout = self.layout
+        settings = context.scene.cityJSONQuery
+        column = layout.column(align=True)
+        column.prop(settings, "object_type")
+        column.prop(settings, "lod")
+        column.prop(settings, "attribute_key")
+        column.prop(settings, "attribute_value")
+        row = layout.row(align=True)
+        row.operator(QueryCityObjectsOperator.bl_idname, text="Select").action = 'SELECT'
+        row.operator(QueryCityObjectsOperator.bl_idname, text="Hide").action = 'HIDE'
+        row.operator(QueryCityObjectsOperator.bl_idname, text="Isolate").action = 'ISOLATE'
+        layout.operator(QueryCityObjectsOperator.bl_idname, text="Show All").action = 'SHOW'
+        layout.separator()
+        column = layout.column(align=True)
+        column.prop(settings, "edit_type")
+        column.prop(settings, "edit_lod")
+        column.prop(settings, "edit_key")
+        column.prop(settings, "edit_value")
+        layout.operator(EditCityObjectsOperator.bl_idname, text="Apply to Matching Objects")
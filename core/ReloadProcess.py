@@ -0,0 +1,82 @@
+import bpy
+from .ImportProcess import ImportProcess
+from .AttributeStore import getCityObjectIDs
+
+class ReloadProcess(ImportProcess):
+
+    # reloads do not pile up duplicates of the materials created by the import
+    reuseMaterials = True
+
+    def __init__(self, filepath, textureSetting, streamingSetting=False):
+        # the spatial filter and the LOD selection of the import are used again, so filtered objects are not created now
+        self.importSettings = self.loadImportSettings(filepath) or {}
+        lodSetting, lodValue = self.importSettings.get('lod', ['ALL', 2.0])
+        # the source of every object has to be tracked to detect changes on the next reload
+        super().__init__(filepath, textureSetting, streamingSetting, True, self.loadSpatialFilter(self.importSettings), lodSetting, lodValue)
+        # number of objects which have been created, replaced, deleted or kept
+        self.created = 0
+        self.replaced = 0
+        self.deleted = 0
+        self.unchanged = 0
+
+    def getReloadError(self):
+        # merged meshes, placeholders and objects without source data cannot be matched to the CityObjects of the file, None if the reload is possible
+        if self.importSettings.get('merge', ['NONE'])[0] != 'NONE':
+            return "The file has been imported with merged objects, which cannot be reloaded. Import it again instead."
+        if self.importSettings.get('lazy'):
+            return "The file has been imported as placeholders, which cannot be reloaded. Import it again instead."
+        if self.importSettings.get('tracking') is False:
+            return "The file has been imported without Keep Source Data, so its objects cannot be reloaded. Import it again instead."
+        if 'tracking' not in self.importSettings and not self.getExistingObjects():
+            # otherwise every CityObject of the file would be imported a second time
+            return "No objects imported from this file with Keep Source Data have been found. Import the file instead."
+        return None
+
+    def cleanUp(self):
+        # the rest of the scene is left as it is
+        pass
+
+    def getExistingObjects(self):
+        # objects in the scene that have been imported from the same file, keyed by their CityObject ID (copies sharing the ID are left as they are)
+        filepath = self.changeTracker.normalizePath(self.filepath)
+        objectIDs = getCityObjectIDs(bpy.data.objects)
+        existing = {}
+        for object in bpy.data.objects:
+            if object.get('cityJSONFile') == filepath and objectIDs[object.name] == object.get('cityJSONID'):
+                existing[object['cityJSONID']] = object
+        return existing
+
+    def removeObject(self, object):
+        mesh = object.data
+        bpy.data.objects.remove(object, do_unlink=True)
+        if mesh is not None and mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+
+    def iterCreateCityObjects(self):
+        existing = self.getExistingObjects()
+        for prepared in self.iterPreparedCityObjects():
+            objID, object, vertices = prepared[:3]
+            oldObject = existing.pop(objID, None)
+            if oldObject is not None:
+                # objects whose source did not change are kept as they are
+                if oldObject.get('cityJSONSourceHash') == self.changeTracker.sourceHash(object, vertices):
+                    self.changeTracker.updateSourceRange(oldObject, self.featureRanges.pop(objID, None))
+                    self.unchanged += 1
+                    yield
+                    continue
+                self.removeObject(oldObject)
+                self.replaced += 1
+            else:
+                self.created += 1
+            # the attributes of unchanged objects are kept, as they may have been edited in the scene
+            self.storeAttributes(objID, object.get('attributes'))
+            self.collections.link(self.createCityObject(*prepared))
+            self.importedCount += 1
+            del prepared
+            yield
+        # objects that are not part of the file anymore
+        for objID, oldObject in existing.items():
+            self.removeObject(oldObject)
+            self.removedIDs.append(objID)
+            self.deleted += 1
+        print('Reload: %d created, %d replaced, %d deleted, %d unchanged' % (self.created, self.replaced, self.deleted, self.unchanged))
@@ -0,0 +1,119 @@
+import json
+import os
+import numpy
+from .JSONStream import JSONStream
+from .JSONWriter import openFile, stripCompression
+
+class SourceReader:
+
+    def __init__(self, filepath, source=None):
+        # imported file the CityObjects are read from again
+        self.filepath = filepath
+        # byte ranges of the transform and the vertices of a CityJSON document and the stamp of the file, recorded by the import
+        self.source = source
+        # CityJSONSeq (JSON Lines) files are read feature by feature by the byte range of their line
+        self.sequenceFile = stripCompression(filepath).lower().endswith('.jsonl')
+        # everything but the CityObjects (header line of a CityJSONSeq file)
+        self.header = None
+        # byte range of every CityObject, keyed by its ID (CityJSON documents whose ranges have not been recorded only)
+        self.objectRanges = None
+        # real world coordinates of all vertices of a CityJSON document
+        self.vertices = None
+        # binary file handle or stream of the document
+        self.file = None
+        self.stream = None
+
+    def open(self):
+        # the file is only indexed, the CityObjects are read when they are needed
+        if self.sequenceFile:
+            self.file = openFile(self.filepath, 'rb')
+            self.header = json.loads(self.file.readline())
+        elif self.source is not None and self.source['stamp'] == getSourceStamp(self.filepath):
+            # the file has not changed since the import, only the transform and the vertices are read
+            self.stream = JSONStream(self.filepath)
+            self.stream.open()
+            ranges = sorted(self.source['ranges'].items(), key=lambda item: item[1][0])
+            self.header = {key: self.stream.readValue(start, end) for key, (start, end) in ranges}
+            self.vertices = self.realWorldVertices(self.header.get('vertices', []))
+            self.header['vertices'] = None
+        else:
+            self.stream = JSONStream(self.filepath)
+            self.stream.open()
+            self.header, index = self.stream.readDocument('CityObjects')
+            self.objectRanges = {objID: (start, end) for objID, start, end in index}
+            self.vertices = self.realWorldVertices(self.header['vertices'])
+            self.header['vertices'] = None
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def realWorldVertices(self, vertices):
+        # same conversion as on import, so the hashes of the sources can be compared
+        vertexArray = numpy.array(vertices, dtype=numpy.float64).reshape(-1, 3)
+        transform = self.header.get('transform')
+        if transform is None:
+            return vertexArray
+        return vertexArray * numpy.array(transform['scale'], dtype=numpy.float64) + numpy.array(transform['translate'], dtype=numpy.float64)
+
+    def readObject(self, objID, byteRange):
+        # the CityObject and the real world coordinates of the vertices it refers to, None if it is not part of the file anymore
+        try:
+            return self.readRange(objID, byteRange)
+        except ValueError:
+            # the byte range does not hold a JSON value anymore
+            return None
+
+    def readRange(self, objID, byteRange):
+        if self.sequenceFile:
+            if byteRange is None:
+                return None
+            start, end = byteRange
+            self.file.seek(start)
+            feature = json.loads(self.file.read(end - start))
+            object = feature.get('CityObjects', {}).get(objID)
+            if object is None:
+                return None
+            return object, self.realWorldVertices(feature['vertices'])
+        objectRange = self.objectRanges.get(objID) if self.objectRanges is not None else byteRange
+        if objectRange is None:
+            return None
+        return self.stream.readValue(*objectRange), self.vertices
+
+def selectLOD(object, lodSetting, lodValue):
+    # drop all geometries of the CityObject except for the one with the chosen LOD, returns False if there is none
+    if lodSetting == 'ALL':
+        return True
+    geometries = [geom for geom in object.get('geometry', []) if 'lod' in geom]
+    if not geometries:
+        # geometries without LOD (e.g. GeometryInstances) are kept as they are
+        return lodSetting != 'VALUE'
+    if lodSetting == 'HIGHEST':
+        chosen = max(geometries, key=lambda geom: float(geom['lod']))
+    elif lodSetting == 'LOWEST':
+        chosen = min(geometries, key=lambda geom: float(geom['lod']))
+    else:
+        matching = [geom for geom in geometries if round(float(geom['lod']), 1) == round(lodValue, 1)]
+        if not matching:
+            return False
+        chosen = matching[0]
+    # the other geometries are released right away, so they are never meshed
+    object['geometry'] = [chosen]
+    return True
+
+def getSourceStamp(filepath):
+    # size and modification time of a file, the recorded byte ranges are only used while they are the same
+    stat = os.stat(filepath)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def openSourceReader(filepath, source=None):
+    # reader of the imported file, None if the file does not exist anymore
+    if not os.path.isfile(filepath):
+        return None
+    reader = SourceReader(filepath, source)
+    reader.open()
+    return reader
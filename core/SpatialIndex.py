@@ -0,0 +1,111 @@
+import math
+import re
+import numpy
+
+def parsePolygon(text):
+    # reads a polygon given as "x y, x y, ..." or as WKT "POLYGON ((x y, x y, ...))"
+    numbers = [float(value) for value in re.findall(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?', text)]
+    if len(numbers) < 6 or len(numbers) % 2 != 0:
+        raise ValueError("The filter polygon needs at least three points given as 'x y' pairs")
+    return [(numbers[i], numbers[i+1]) for i in range(0, len(numbers), 2)]
+
+class SpatialFilter:
+
+    def __init__(self, bbox=None, polygon=None):
+        # polygon in CRS coordinates as list of (x, y), None if only the bounding box is used
+        self.polygon = polygon
+        # bounding box in CRS coordinates (min x, min y, max x, max y)
+        if polygon is not None:
+            xs = [point[0] for point in polygon]
+            ys = [point[1] for point in polygon]
+            bbox = (min(xs), min(ys), max(xs), max(ys))
+        self.bbox = tuple(bbox)
+
+    def intersectsBBox(self, extent):
+        # True if the extent (min x, min y, max x, max y) overlaps the bounding box of the filter
+        return extent[0] <= self.bbox[2] and extent[2] >= self.bbox[0] and extent[1] <= self.bbox[3] and extent[3] >= self.bbox[1]
+
+    def containsPoint(self, x, y):
+        # ray casting test of a point against the polygon
+        inside = False
+        j = len(self.polygon) - 1
+        for i in range(len(self.polygon)):
+            xi, yi = self.polygon[i]
+            xj, yj = self.polygon[j]
+            if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+                inside = not inside
+            j = i
+        return inside
+
+    def segmentsIntersect(self, p1, p2, q1, q2):
+        def orientation(a, b, c):
+            return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+        d1 = orientation(q1, q2, p1)
+        d2 = orientation(q1, q2, p2)
+        d3 = orientation(p1, p2, q1)
+        d4 = orientation(p1, p2, q2)
+        return ((d1 > 0) != (d2 > 0) or d1 == 0 or d2 == 0) and ((d3 > 0) != (d4 > 0) or d3 == 0 or d4 == 0)
+
+    def intersects(self, extent):
+        # True if the extent (min x, min y, max x, max y) intersects the bounding box or the polygon of the filter
+        if not self.intersectsBBox(extent):
+            return False
+        if self.polygon is None:
+            return True
+        minX, minY, maxX, maxY = extent
+        # a point of the polygon lies inside of the extent
+        for x, y in self.polygon:
+            if minX <= x <= maxX and minY <= y <= maxY:
+                return True
+        # a corner of the extent lies inside of the polygon
+        corners = [(minX, minY), (maxX, minY), (maxX, maxY), (minX, maxY)]
+        for x, y in corners:
+            if self.containsPoint(x, y):
+                return True
+        # an edge of the polygon crosses an edge of the extent
+        for i in range(len(self.polygon)):
+            p1 = self.polygon[i - 1]
+            p2 = self.polygon[i]
+            for j in range(4):
+                if self.segmentsIntersect(p1, p2, corners[j - 1], corners[j]):
+                    return True
+        return False
+
+class SpatialIndex:
+
+    def __init__(self, keys, extents):
+        # keys (CityObject IDs) of the indexed extents
+        self.keys = list(keys)
+        # extents of the objects (min x, min y, max x, max y)
+        self.extents = numpy.asarray(extents, dtype=numpy.float64).reshape(-1, 4)
+        # uniform grid with about one object per cell: (column, row) -> indices of the objects overlapping the cell
+        self.cells = {}
+        if len(self.keys) == 0:
+            return
+        self.origin = self.extents[:, :2].min(axis=0)
+        size = self.extents[:, 2:].max(axis=0) - self.origin
+        self.cellCount = max(1, int(math.sqrt(len(self.keys))))
+        self.cellSize = numpy.maximum(size / self.cellCount, 1e-9)
+        firstCells = self.cellRange(self.extents[:, :2])
+        lastCells = self.cellRange(self.extents[:, 2:])
+        for index, (x0, y0, x1, y1) in enumerate(numpy.hstack((firstCells, lastCells)).tolist()):
+            for column in range(x0, x1 + 1):
+                for row in range(y0, y1 + 1):
+                    self.cells.setdefault((column, row), []).append(index)
+
+    def cellRange(self, points):
+        # grid cell of every point, clamped to the grid
+        return numpy.clip(((points - self.origin) // self.cellSize).astype(numpy.int64), 0, self.cellCount - 1)
+
+    def query(self, spatialFilter):
+        # keys of all objects whose extent intersects the filter
+        if len(self.keys) == 0:
+            return set()
+        bbox = numpy.array(spatialFilter.bbox, dtype=numpy.float64)
+        x0, y0 = self.cellRange(bbox[:2]).tolist()
+        x1, y1 = self.cellRange(bbox[2:]).tolist()
+        candidates = set()
+        for column in range(x0, x1 + 1):
+            for row in range(y0, y1 + 1):
+                candidates.update(self.cells.get((column, row), ()))
+        return {self.keys[index] for index in candidates if spatialFilter.intersects(self.extents[index].tolist())}
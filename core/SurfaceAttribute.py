@@ -0,0 +1,83 @@
+import json
+import bmesh
+import numpy
+
+class SurfaceAttribute:
+
+    # integer face attribute holding the index of the surface type of every face, -1 if the face has no semantics
+    attributeName = 'cityJSONSurface'
+    # custom property of the mesh holding the surface types the attribute refers to (JSON list)
+    # it belongs to the mesh like the attribute, so the instances of a template share it
+    tableName = 'cityJSONSurfaces'
+
+    def __init__(self, object):
+        # blender object whose faces are tagged
+        self.object = object
+
+    def getTable(self):
+        return json.loads(self.object.data.get(self.tableName, '[]'))
+
+    def getIndex(self, surfaceType):
+        # index of the surface type in the table of the mesh, new surface types are appended
+        table = self.getTable()
+        if surfaceType not in table:
+            table.append(surfaceType)
+            self.object.data[self.tableName] = json.dumps(table)
+        return table.index(surfaceType)
+
+    def read(self):
+        # surface index of every face, None if the object has no semantics attribute
+        mesh = self.object.data
+        attribute = mesh.attributes.get(self.attributeName)
+        if attribute is None or self.tableName not in mesh:
+            return None
+        values = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+        attribute.data.foreach_get('value', values)
+        return values
+
+    def write(self, values):
+        # set the surface index of all faces at once (object mode)
+        mesh = self.object.data
+        attribute = mesh.attributes.get(self.attributeName)
+        if attribute is None:
+            attribute = mesh.attributes.new(name=self.attributeName, type='INT', domain='FACE')
+        attribute.data.foreach_set('value', numpy.asarray(values, dtype=numpy.int32))
+
+    def compactSemantics(self, surfaceIndices, surfaceTypes):
+        # semantic values and surfaces of CityJSON, only the surface types used by the faces are written, faces without semantics get null
+        surfaceIndices = numpy.asarray(surfaceIndices, dtype=numpy.int64)
+        valid = (surfaceIndices >= 0) & (surfaceIndices < len(surfaceTypes))
+        usedSurfaces, values = numpy.unique(surfaceIndices[valid], return_inverse=True)
+        semanticValues = numpy.full(len(surfaceIndices), -1, dtype=numpy.int64)
+        semanticValues[valid] = values.reshape(-1)
+        surfaces = [{"type": surfaceTypes[index]} for index in usedSurfaces.tolist()]
+        return [None if value < 0 else value for value in semanticValues.tolist()], surfaces
+
+    def getMaterialSlot(self, material):
+        # slot of the material in the object, the material is appended if the object does not use it yet
+        materials = self.object.data.materials
+        for slot, slotMaterial in enumerate(materials):
+            if slotMaterial is not None and slotMaterial.name == material.name:
+                return slot
+        materials.append(material)
+        return len(materials) - 1
+
+    def writeSelected(self, surfaceType, material=None):
+        # tag the selected faces with the surface type (edit mode), the material is only used for display
+        mesh = self.object.data
+        index = self.getIndex(surfaceType)
+        slot = self.getMaterialSlot(material) if material is not None else None
+        editMesh = bmesh.from_edit_mesh(mesh)
+        layer = editMesh.faces.layers.int.get(self.attributeName)
+        if layer is None:
+            layer = editMesh.faces.layers.int.new(self.attributeName)
+            # the semantics of the other faces are taken over from their materials
+            slotIndices = [self.getIndex(material['CJEOtype']) if material is not None and 'CJEOtype' in material else -1 for material in mesh.materials]
+            for face in editMesh.faces:
+                face[layer] = slotIndices[face.material_index] if face.material_index < len(slotIndices) else -1
+        for face in editMesh.faces:
+            if face.select:
+                face[layer] = index
+                if slot is not None:
+                    face.material_index = slot
+        bmesh.update_edit_mesh(mesh)
@@ -0,0 +1,40 @@
+import numpy
+
+class TextureIndex:
+
+    def __init__(self, verticesTexture, textures=None):
+        # "vertices-texture" list of the exported appearance, which is filled without duplicates
+        self.verticesTexture = verticesTexture
+        # index of every uv coordinate in "vertices-texture", keyed by the rounded (u, v) tuple
+        self.uvIndex = {}
+        # index of every texture in the "textures" list of the appearance, keyed by the name of its image
+        self.textures = textures if textures is not None else {}
+
+    def addTexture(self, name):
+        index = self.textures.get(name)
+        if index is None:
+            index = len(self.textures)
+            self.textures[name] = index
+        return index
+
+    def getTexture(self, name):
+        # index of the texture, None if the image is not part of the appearance
+        return self.textures.get(name)
+
+    def addUVs(self, uvs):
+        # returns the index in "vertices-texture" of every uv coordinate of the array, new coordinates are appended
+        if len(uvs) == 0:
+            return numpy.zeros(0, dtype=numpy.int64)
+        rounded = numpy.round(uvs.astype(numpy.float64), 7)
+        # every distinct coordinate of the array only needs a single lookup
+        uniqueUVs, inverse = numpy.unique(rounded, axis=0, return_inverse=True)
+        uniqueIndices = numpy.empty(len(uniqueUVs), dtype=numpy.int64)
+        for i, uv in enumerate(uniqueUVs.tolist()):
+            key = (uv[0], uv[1])
+            index = self.uvIndex.get(key)
+            if index is None:
+                index = len(self.verticesTexture)
+                self.uvIndex[key] = index
+                self.verticesTexture.append(uv)
+            uniqueIndices[i] = index
+        return uniqueIndices[inverse.reshape(-1)]